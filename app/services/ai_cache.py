@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from app.services.disk_cache import DiskCache
+
+
+class AIResponseCache(DiskCache):
+    """
+    On-disk cache of AI endpoint responses.
+
+    Keys hash the request payload together with the table type, the endpoint
+    and the model and prompt versions, so a new model or prompt never serves
+    stale answers. Entries expire ``ttl_seconds`` after they were written and
+    are evicted least recently used first once the cache exceeds ``max_bytes``.
+    """
+
+    def __init__(self, root: str, max_bytes: int, ttl_seconds: float):
+        super().__init__(root, max_bytes)
+        self.ttl_seconds = ttl_seconds
+
+    def cache_key(self, payload: Any, table_type: str, endpoint: Optional[str]) -> str:
+        fingerprint = json.dumps({
+            'payload': payload,
+            'table_type': table_type,
+            'endpoint': endpoint,
+            'model_version': os.getenv('AI_MODEL_VERSION', '1'),
+            'prompt_version': os.getenv('AI_PROMPT_VERSION', '1')
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+
+    def get_response(self, key: str) -> Optional[Any]:
+        """Return a cached response, or None if it is missing or expired."""
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if self.ttl_seconds and time.time() - entry['created'] > self.ttl_seconds:
+            self.delete(key)
+            return None
+        return entry['response']
+
+    def put_response(self, key: str, response: Any):
+        entry = {'created': time.time(), 'response': response}
+        self.put_bytes(key, json.dumps(entry, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+_ai_cache: Optional[AIResponseCache] = None
+
+
+def get_ai_cache() -> AIResponseCache:
+    """Return the process-wide AI response cache."""
+    global _ai_cache
+    if _ai_cache is None:
+        _ai_cache = AIResponseCache(
+            os.getenv('AI_CACHE_DIR', str(Path('cache') / 'ai')),
+            int(os.getenv('AI_CACHE_MAX_BYTES', str(1024 * 1024 * 1024))),
+            float(os.getenv('AI_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+        )
+    return _ai_cache
@@ -0,0 +1,159 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Dict, Optional
+
+import httpx
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class AIRequestError(Exception):
+    """Raised when the AI endpoint returns an error or cannot be reached."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RateLimiter:
+    """Token bucket limiting how many requests start per second."""
+
+    def __init__(self, rate_per_second: float, burst: Optional[int] = None):
+        self.rate = rate_per_second
+        self.capacity = burst or max(1, int(rate_per_second))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AIClient:
+    """
+    Connection-pooled async HTTP client for the AI endpoint.
+
+    The client lives on its own event loop in a background thread, so the
+    connection pool and the rate limiter are shared by every caller in the
+    process, including synchronous code running in job threads (see ``run``).
+    Requests that fail with 429, a 5xx status or a transport error are
+    retried with exponential backoff and full jitter, honouring Retry-After.
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        max_connections: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        rate_limit: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.timeout = timeout if timeout is not None else float(os.getenv('AI_REQUEST_TIMEOUT', '120'))
+        self.connect_timeout = connect_timeout if connect_timeout is not None else float(os.getenv('AI_CONNECT_TIMEOUT', '10'))
+        self.max_connections = max_connections or int(os.getenv('AI_MAX_CONNECTIONS', '10'))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('AI_MAX_RETRIES', '4'))
+        self.backoff_base = backoff_base if backoff_base is not None else float(os.getenv('AI_BACKOFF_BASE', '0.5'))
+        self.backoff_max = backoff_max if backoff_max is not None else float(os.getenv('AI_BACKOFF_MAX', '30'))
+        rate_limit = rate_limit if rate_limit is not None else float(os.getenv('AI_RATE_LIMIT_PER_SECOND', '5'))
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='ai-client', daemon=True)
+        self._thread.start()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._transport = transport
+        self._rate_limiter = self.run(self._create_rate_limiter(rate_limit))
+
+    async def _create_rate_limiter(self, rate_limit: float) -> RateLimiter:
+        # asyncio primitives must be created on the loop that uses them
+        return RateLimiter(rate_limit)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                transport=self._transport
+            )
+        return self._client
+
+    def run(self, coro: Awaitable) -> Any:
+        """Run a coroutine on the client's event loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, min(self.backoff_max, float(retry_after)))
+            except ValueError:
+                pass
+        return delay
+
+    async def post_json(self, url: str, payload: Any, headers: Optional[Dict[str, str]] = None) -> Any:
+        """POST a JSON payload and return the decoded JSON response."""
+        client = self._get_client()
+
+        for attempt in range(self.max_retries + 1):
+            await self._rate_limiter.acquire()
+            try:
+                response = await client.post(url, json=payload, headers=headers)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise AIRequestError(f"Azure AI Foundry API call failed: {str(e) or type(e).__name__}")
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                raise AIRequestError(f"Azure AI Foundry API call failed: {response.text}", response.status_code)
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    def close(self):
+        """Close pooled connections and stop the event loop."""
+        if self._client is not None:
+            self.run(self._client.aclose())
+            self._client = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+_ai_client: Optional[AIClient] = None
+_ai_client_lock = threading.Lock()
+
+
+def get_ai_client() -> AIClient:
+    """Return the process-wide AI client."""
+    global _ai_client
+    with _ai_client_lock:
+        if _ai_client is None:
+            _ai_client = AIClient()
+        return _ai_client
+
+
+def close_ai_client():
+    global _ai_client
+    with _ai_client_lock:
+        if _ai_client is not None:
+            _ai_client.close()
+            _ai_client = None
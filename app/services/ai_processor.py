@@ -1,34 +1,77 @@
 import pandas as pd
+import numpy as np
 import json
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-import requests
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional
+import asyncio
 import os
-from datetime import datetime
+from operator import itemgetter
+from app.services.table_format import COLUMNAR, is_columnar, iter_table_rows, table_columns, table_meta, table_row_count
+from app.services.intermediate_store import BUNDLE_SUFFIX, find_extractions, iter_extraction_batches, iter_extraction_tables, read_extraction, read_extraction_schema, source_filename
+from app.services.manifest import ClientManifest, fingerprint
+from app.services.metrics import Stage, StageTimings
+from app.services.file_index import get_file_index
+from app.services.disk_cache import atomic_path
+from app.services.json_writer import JSONStreamWriter
+from app.services.ai_client import AIClient, get_ai_client
+from app.services.ai_cache import get_ai_cache
+from app.services.output_writer import FrameSpool, OutputWriter
+from app.services.schema_inference import SCHEMA_KEY, concat_values, has_schema, labels, missing_values, typed_values
 
 class AIProcessor:
-    def __init__(self, processed_dir: str):
+    def __init__(
+        self,
+        processed_dir: str,
+        client: Optional[AIClient] = None,
+        use_cache: bool = True,
+        timings: Optional[StageTimings] = None,
+        job_id: Optional[str] = None
+    ):
         self.processed_dir = Path(processed_dir)
+        # Per-stage totals, for the job result
+        self.timings = timings
+        # Recorded in the file index as the source of the outputs
+        self.job_id = job_id
         self.api_key = os.getenv('AZURE_AI_FOUNDRY_API_KEY')
         self.api_endpoint = os.getenv('AZURE_AI_FOUNDRY_ENDPOINT')
+        self.client = client or get_ai_client()
+        self.use_cache = use_cache
+        # Tables are sent to the AI endpoint in chunks of at most this many rows
+        # (and roughly this many tokens, if set); chunks never span two tables
+        self.chunk_rows = int(os.getenv('AI_CHUNK_ROWS', '2000'))
+        self.chunk_tokens = int(os.getenv('AI_CHUNK_TOKENS', '0'))
+        self.max_concurrent_chunks = int(os.getenv('AI_MAX_CONCURRENT_CHUNKS', '4'))
+        # 'streaming' combines tables batch by batch instead of loading them all
+        self.pipeline_mode = os.getenv('PIPELINE_MODE', 'materialized')
+        self.batch_rows = int(os.getenv('STREAM_BATCH_ROWS', '10000'))
 
-    def load_json_files(self) -> List[Dict[str, Any]]:
-        """Load all JSON files from the processed directory."""
+    def load_json_files(self, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Load all extraction outputs from the processed directory.
+
+        Args:
+            columns: Optional; only load these columns (matched case-insensitively)
+        """
         all_data = []
-        for json_file in self.processed_dir.glob('*.json'):
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                all_data.append(data)
+        for path in find_extractions(self.processed_dir):
+            with Stage('load_intermediate', Path(source_filename(path)).suffix, path.suffix.lstrip('.'), self.timings) as stage:
+                data = read_extraction(path, columns)
+                stage.rows = sum(table_row_count(table) for table in data['tables'])
+                stage.bytes = path.stat().st_size
+            all_data.append(data)
         return all_data
 
+    def load_table_schemas(self) -> List[Dict[str, Any]]:
+        """Load the table names and columns of all extraction outputs, without their rows."""
+        return [read_extraction_schema(path) for path in find_extractions(self.processed_dir)]
+
     def analyze_table_structure(self, tables: List[Dict[str, Any]]) -> Dict[str, List[str]]:
         """Analyze the structure of tables to find common columns."""
         all_columns = {}
         for table in tables:
             for table_data in table.get('tables', []):
-                data = table_data.get('data', [])
-                if data:
-                    columns = list(data[0].keys())
+                columns = table_columns(table_data)
+                if columns:
                     table_name = table_data.get('sheet_name', table_data.get('table_number', 'unknown'))
                     all_columns[f"{table['filename']}_{table_name}"] = columns
         return all_columns
@@ -44,34 +87,138 @@ class AIProcessor:
         common_columns = [col for col, freq in column_frequency.items() if freq >= 2]
         return common_columns
 
-    def combine_tables(self, all_data: List[Dict[str, Any]], common_columns: List[str]) -> pd.DataFrame:
-        """Combine tables based on common columns."""
-        combined_data = []
+    def _resolve_columns(self, columns: List[str], common_columns: List[str]) -> Dict[str, Optional[str]]:
+        """Map each common column to the first table column matching it case-insensitively."""
+        by_lower = {}
+        for col in columns:
+            by_lower.setdefault(col.lower(), col)
+        return {col: by_lower.get(col.lower()) for col in common_columns}
+
+    def _project_table(self, table: Dict[str, Any], column_map: Dict[str, Optional[str]], num_rows: int) -> Dict[str, np.ndarray]:
+        """Pick the mapped columns of a table as object arrays; unmatched columns are all None."""
+        projected = {col: np.full(num_rows, None, dtype=object) for col, source_col in column_map.items() if source_col is None}
+        wanted = [(col, source_col) for col, source_col in column_map.items() if source_col is not None]
+        if not wanted:
+            return projected
+
+        if is_columnar(table):
+            positions = {name: idx for idx, name in enumerate(table['columns'])}
+            for col, source_col in wanted:
+                values = np.empty(num_rows, dtype=object)
+                values[:] = table['column_data'][positions[source_col]]
+                projected[col] = values
+            return projected
+
+        source_cols = [source_col for _, source_col in wanted]
+        try:
+            # One C-level lookup per row for all wanted columns
+            getter = itemgetter(*source_cols)
+            rows = list(map(getter, table['data']))
+            if len(source_cols) == 1:
+                rows = [(value,) for value in rows]
+        except KeyError:
+            rows = [tuple(row.get(source_col) for source_col in source_cols) for row in table['data']]
+
+        matrix = np.empty((num_rows, len(source_cols)), dtype=object)
+        matrix[:] = rows
+        for idx, (col, _) in enumerate(wanted):
+            projected[col] = matrix[:, idx]
+        return projected
+
+    def _combine_columns(self, all_data: List[Dict[str, Any]], common_columns: List[str]) -> Dict[str, np.ndarray]:
+        """Project every table onto the common columns and concatenate them into one object array per column."""
+        pieces: Dict[str, List[np.ndarray]] = {}
         
         for file_data in all_data:
             filename = file_data['filename']
             for table in file_data['tables']:
+                num_rows = table_row_count(table)
+                if not num_rows:
+                    continue
                 table_name = table.get('sheet_name', table.get('table_number', 'unknown'))
-                for row in table['data']:
-                    processed_row = {
-                        'source_file': filename,
-                        'table_name': table_name
-                    }
-                    
-                    # Add data for common columns
-                    for col in common_columns:
-                        # Try to find the column with case-insensitive matching
-                        matching_col = next(
-                            (k for k in row.keys() if k.lower() == col.lower()),
-                            None
-                        )
-                        processed_row[col] = row.get(matching_col, None)
-                    
-                    combined_data.append(processed_row)
+                column_map = self._resolve_columns(table_columns(table), common_columns)
+                
+                table_pieces = {
+                    'source_file': np.full(num_rows, filename, dtype=object),
+                    'table_name': np.full(num_rows, table_name, dtype=object)
+                }
+                projected = self._project_table(table, column_map, num_rows)
+                for col in common_columns:
+                    table_pieces[col] = projected[col]
+                
+                for col, values in table_pieces.items():
+                    pieces.setdefault(col, []).append(values)
         
-        return pd.DataFrame(combined_data)
+        return {col: np.concatenate(arrays) for col, arrays in pieces.items()}
 
-    def _call_azure_ai_foundry(self, table_data: Dict[str, Any], table_type: str) -> Dict[str, Any]:
+    def _combine_typed_columns(self, all_data: List[Dict[str, Any]], common_columns: List[str]) -> Dict[str, Any]:
+        """
+        _combine_columns for tables that carry a schema (see schema_inference).
+
+        Each column is built as a compact array of its schema type (float64,
+        int32, datetime64, Categorical) instead of an object array, and
+        source_file and table_name become categoricals. Columns a table
+        lacks are filled with missing values of the column's type.
+        """
+        pieces: Dict[str, List[Any]] = {col: [] for col in common_columns}
+        files, table_names, counts = [], [], []
+
+        for file_data in all_data:
+            for table in file_data['tables']:
+                num_rows = table_row_count(table)
+                if not num_rows:
+                    continue
+                files.append(file_data['filename'])
+                table_names.append(table.get('sheet_name', table.get('table_number', 'unknown')))
+                counts.append(num_rows)
+
+                schema = table.get(SCHEMA_KEY, {})
+                positions = {name: idx for idx, name in enumerate(table['columns'])}
+                for col, source_col in self._resolve_columns(table_columns(table), common_columns).items():
+                    if source_col is None:
+                        # Filled in once the column's type is known from the other tables
+                        pieces[col].append(num_rows)
+                    else:
+                        pieces[col].append(typed_values(table['column_data'][positions[source_col]], schema.get(source_col)))
+
+        if not counts:
+            return {}
+        columns = {'source_file': labels(files, counts), 'table_name': labels(table_names, counts)}
+        for col, col_pieces in pieces.items():
+            present = [piece for piece in col_pieces if not isinstance(piece, int)]
+            columns[col] = concat_values([
+                missing_values(present, piece) if isinstance(piece, int) else piece
+                for piece in col_pieces
+            ])
+        return columns
+
+    def combine_tables(self, all_data: List[Dict[str, Any]], common_columns: List[str]) -> pd.DataFrame:
+        """
+        Combine tables based on common columns.
+
+        Common columns are resolved against each table's columns once, then
+        every table is projected column by column and the columns are
+        concatenated with NumPy. Rows of a records-layout table are expected
+        to share the keys of its first row, as the extractors produce them.
+
+        If every table has an inferred schema, the combined columns keep
+        their types (see ``_combine_typed_columns``).
+        """
+        with Stage('combine', timings=self.timings) as stage:
+            tables = [table for file_data in all_data for table in file_data['tables']]
+            if tables and all(has_schema(table) and is_columnar(table) for table in tables):
+                columns = self._combine_typed_columns(all_data, common_columns)
+            else:
+                columns = self._combine_columns(all_data, common_columns)
+            if not columns:
+                return pd.DataFrame()
+            
+            # Let pandas infer dtypes from the combined columns, as it would from row dicts
+            df = pd.DataFrame(columns).infer_objects()
+            stage.rows = len(df)
+        return df
+
+    async def _acall_azure_ai_foundry(self, table_data: Dict[str, Any], table_type: str) -> Dict[str, Any]:
         """
         Call Azure AI Foundry API to process table data
         
@@ -92,131 +239,458 @@ class AIProcessor:
             'table_type': table_type
         }
 
-        response = requests.post(
-            self.api_endpoint,
-            headers=headers,
-            json=payload
-        )
+        # Round trip including retries and rate limiting
+        with Stage('ai_request', timings=self.timings) as stage:
+            stage.rows = sum(
+                len(table.get('data', []))
+                for file_data in table_data.get('tables', [])
+                for table in file_data.get('tables', [])
+            )
+            return await self.client.post_json(self.api_endpoint, payload, headers)
 
-        if response.status_code != 200:
-            raise Exception(f"Azure AI Foundry API call failed: {response.text}")
+    def _call_azure_ai_foundry(self, table_data: Dict[str, Any], table_type: str) -> Dict[str, Any]:
+        """Blocking wrapper around _acall_azure_ai_foundry for synchronous callers."""
+        return self.client.run(self._acall_azure_ai_foundry(table_data, table_type))
 
-        return response.json()
+    def iter_chunks(self, all_data: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Split extracted tables into request-sized chunks.
 
-    def process_kupci_table(self, table_data: Dict[str, Any]) -> pd.DataFrame:
+        Rows are converted to dicts lazily, so only the chunk being built is
+        materialized. Each chunk carries a payload in the same shape as an
+        unchunked request, limited to one slice of one table.
         """
-        Process Kupci table using Azure AI Foundry
+        for file_data in all_data:
+            for table in file_data['tables']:
+                yield from self._table_chunks(file_data['filename'], table_meta(table), iter_table_rows(table))
+
+    def iter_extraction_chunks(self, extraction_files: List[Path]) -> Iterator[Dict[str, Any]]:
+        """
+        ``iter_chunks`` for the extraction outputs on disk.
+
+        Files are read one table at a time (see ``iter_extraction_tables``),
+        so apart from a JSON file being parsed, only the chunk being built
+        is held in memory, however many files the client has.
+        """
+        for path in extraction_files:
+            for filename, meta, rows in iter_extraction_tables(path, self.chunk_rows):
+                yield from self._table_chunks(filename, meta, rows)
+
+    def _table_chunks(self, filename: str, meta: Dict[str, Any], table_rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        rows = []
+        tokens = 0
+        row_offset = 0
+
+        for row in table_rows:
+            # Roughly four characters of JSON per token
+            row_tokens = len(json.dumps(row, ensure_ascii=False, default=str)) // 4 + 1 if self.chunk_tokens else 0
+            if rows and (len(rows) >= self.chunk_rows or (self.chunk_tokens and tokens + row_tokens > self.chunk_tokens)):
+                yield self._make_chunk(filename, meta, rows, row_offset)
+                row_offset += len(rows)
+                rows = []
+                tokens = 0
+            rows.append(row)
+            tokens += row_tokens
+
+        if rows:
+            yield self._make_chunk(filename, meta, rows, row_offset)
+
+    def _make_chunk(self, filename: str, meta: Dict[str, Any], rows: List[Dict[str, Any]], row_offset: int) -> Dict[str, Any]:
+        return {
+            'filename': filename,
+            'table_name': meta.get('sheet_name', meta.get('table_number', 'unknown')),
+            'row_offset': row_offset,
+            'row_count': len(rows),
+            'payload': {'tables': [{'filename': filename, 'tables': [{**meta, 'data': rows}]}]}
+        }
+
+    async def _acached_call(self, payload: Dict[str, Any], table_type: str, semaphore: asyncio.Semaphore):
+        """
+        Call the AI endpoint unless the response for this payload is cached.
+
+        Returns the response and whether it came from the cache. Cache files
+        are read and written off the event loop.
+        """
+        if not self.use_cache:
+            async with semaphore:
+                return await self._acall_azure_ai_foundry(payload, table_type), False
+
+        cache = get_ai_cache()
+        loop = asyncio.get_running_loop()
+        key = cache.cache_key(payload, table_type, self.api_endpoint)
+        response = await loop.run_in_executor(None, cache.get_response, key)
+        cache.record(response is not None)
+        if response is not None:
+            if self.timings is not None:
+                self.timings.skip('ai_request')
+            return response, True
+
+        async with semaphore:
+            response = await self._acall_azure_ai_foundry(payload, table_type)
+        await loop.run_in_executor(None, cache.put_response, key, response)
+        return response, False
+
+    async def _aprocess_chunks(self, extraction_files: List[Path], table_type: str, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        """
+        Send every chunk for one table type and spool the processed tables in chunk order.
+
+        At most max_concurrent_chunks chunks are built ahead of their responses.
+        Each response is turned into a DataFrame as soon as it arrives and
+        appended to a FrameSpool once the chunks before it are, so neither
+        the extractions nor the responses are held in memory as a whole.
         """
-        processed_data = self._call_azure_ai_foundry(table_data, 'kupci')
+        async def process_chunk(index: int, chunk: Dict[str, Any]):
+            response, cached = await self._acached_call(chunk['payload'], table_type, semaphore)
+            return index, pd.DataFrame(response['processed_table']), cached
+
+        loop = asyncio.get_running_loop()
+        spool = FrameSpool(self.processed_dir)
+        ready = {}
+        pending = set()
+        next_index = 0
+        chunk_count = 0
+        cached_chunks = 0
+
+        async def collect(return_when):
+            nonlocal pending, next_index, cached_chunks
+            done, pending = await asyncio.wait(pending, return_when=return_when)
+            for task in done:
+                index, df, cached = task.result()
+                ready[index] = df
+                cached_chunks += cached
+            while next_index in ready:
+                await loop.run_in_executor(None, spool.append, ready.pop(next_index))
+                next_index += 1
+
+        try:
+            for index, chunk in enumerate(self.iter_extraction_chunks(extraction_files)):
+                pending.add(asyncio.ensure_future(process_chunk(index, chunk)))
+                chunk_count += 1
+                if len(pending) >= self.max_concurrent_chunks:
+                    await collect(asyncio.FIRST_COMPLETED)
+            while pending:
+                await collect(asyncio.FIRST_COMPLETED)
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            spool.close()
+            raise
+
+        spool.finish()
+        return {'spool': spool, 'chunks': chunk_count, 'cached_chunks': cached_chunks}
+
+    def _process_chunked(
+        self,
+        extraction_files: List[Path],
+        table_types: List[str],
+        on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Process the tables for several table types concurrently, in chunks.
+
+        Each result holds its processed table in a FrameSpool, which the
+        caller must close. If a table type fails, the others still finish
+        (and are passed to ``on_result``) before the error is raised.
+
+        Args:
+            on_result: Optional; called with each table type's result as soon as it is complete
+        """
+        async def process_type(table_type: str, semaphore: asyncio.Semaphore):
+            result = await self._aprocess_chunks(extraction_files, table_type, semaphore)
+            if on_result:
+                on_result(table_type, result)
+            return result
+
+        async def process_all():
+            semaphore = asyncio.Semaphore(self.max_concurrent_chunks)
+            results = await asyncio.gather(*(
+                process_type(table_type, semaphore) for table_type in table_types
+            ), return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            return dict(zip(table_types, results))
+        return self.client.run(process_all())
+
+    def _save_processed_table(self, processed_data: Dict[str, Any], table_type: str) -> pd.DataFrame:
         df = pd.DataFrame(processed_data['processed_table'])
         
-        # Save to Excel
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_path = self.processed_dir / f'kupci_processed_{timestamp}.xlsx'
-        df.to_excel(output_path, index=False)
+        # Save in the configured output formats
+        writer = OutputWriter(self.processed_dir, timings=self.timings, source_job=self.job_id)
+        writer.submit(f'{table_type}_processed', df)
+        writer.wait()
         
         return df
 
+    def process_kupci_table(self, table_data: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Process Kupci table using Azure AI Foundry
+        """
+        return self._save_processed_table(self._call_azure_ai_foundry(table_data, 'kupci'), 'kupci')
+
     def process_dobavljaci_table(self, table_data: Dict[str, Any]) -> pd.DataFrame:
         """
         Process Dobavljaci table using Azure AI Foundry
         """
-        processed_data = self._call_azure_ai_foundry(table_data, 'dobavljaci')
-        df = pd.DataFrame(processed_data['processed_table'])
-        
-        # Save to Excel
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_path = self.processed_dir / f'dobavljaci_processed_{timestamp}.xlsx'
-        df.to_excel(output_path, index=False)
-        
-        return df
+        return self._save_processed_table(self._call_azure_ai_foundry(table_data, 'dobavljaci'), 'dobavljaci')
+
+    def _extraction_inputs(self, manifest: ClientManifest, extraction_files: List[Path]) -> Dict[str, str]:
+        """Identify each extraction by the key it was extracted for, or by its size and mtime if unknown."""
+        inputs = {}
+        for path in extraction_files:
+            source = source_filename(path)
+            entry = manifest.get(f'extraction:{source}')
+            if entry is not None and path.name in entry.get('outputs', []):
+                inputs[source] = entry['inputs']['key']
+            else:
+                stat = path.stat()
+                inputs[source] = f'{stat.st_size}:{stat.st_mtime_ns}'
+        return inputs
+
+    def _ai_stage_inputs(self, table_type: str, extraction_inputs: Dict[str, str], formats: List[str]) -> Dict[str, Any]:
+        """Everything the processed output of one table type depends on."""
+        return {
+            'extractions': extraction_inputs,
+            'table_type': table_type,
+            'endpoint': self.api_endpoint,
+            'model_version': os.getenv('AI_MODEL_VERSION', '1'),
+            'prompt_version': os.getenv('AI_PROMPT_VERSION', '1'),
+            'chunk_rows': self.chunk_rows,
+            'chunk_tokens': self.chunk_tokens,
+            'output_formats': formats
+        }
+
+    def _iter_output(self, paths: List[str]) -> Iterator[pd.DataFrame]:
+        """Read a previously written processed table in pieces, preferring the format that keeps dtypes best."""
+        by_suffix = {Path(path).suffix: path for path in paths}
+        if '.parquet' in by_suffix:
+            import pyarrow.parquet as pq
+
+            for record_batch in pq.ParquetFile(by_suffix['.parquet']).iter_batches(batch_size=self.batch_rows):
+                yield record_batch.to_pandas()
+        elif '.csv' in by_suffix:
+            yield from pd.read_csv(by_suffix['.csv'], encoding='utf-8-sig', chunksize=self.batch_rows)
+        else:
+            yield pd.read_excel(by_suffix['.xlsx'])
 
     def process_tables_with_ai(self, table_type: Optional[str] = None) -> Dict[str, Any]:
         """
         Process either Kupci or Dobavljaci tables using Azure AI Foundry, or both if table_type is None
+
+        The client manifest records what every processed output was computed
+        from. A table type whose extractions and settings are unchanged is
+        not sent again and keeps its existing output files, and the merged
+        file is only rebuilt when one of its two inputs changed. Without the
+        AI cache (``use_cache=False``) nothing is reused.
         
         Args:
             table_type: Optional; Either 'kupci', 'dobavljaci', or None to process both
         """
+        # Processed tables are spooled to disk until their outputs are written
+        spools = []
+        writer = None
         try:
-            # Load all JSON files
-            all_data = self.load_json_files()
-            if not all_data:
+            extraction_files = find_extractions(self.processed_dir)
+            if not extraction_files:
                 return {
                     'status': 'error',
                     'message': 'No processed files found'
                 }
 
             results = {}
-            output_files = {}
-
-            # Process tables based on type
-            if table_type is None or table_type.lower() == 'kupci':
-                kupci_df = self.process_kupci_table({'tables': all_data})
-                results['kupci'] = {
-                    'total_rows': len(kupci_df),
-                    'processed_columns': list(kupci_df.columns)
-                }
-                # Save Kupci to Excel
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                kupci_path = self.processed_dir / f'kupci_processed_{timestamp}.xlsx'
-                kupci_df.to_excel(kupci_path, index=False)
-                output_files['kupci'] = str(kupci_path)
-
-            if table_type is None or table_type.lower() == 'dobavljaci':
-                dobavljaci_df = self.process_dobavljaci_table({'tables': all_data})
-                results['dobavljaci'] = {
-                    'total_rows': len(dobavljaci_df),
-                    'processed_columns': list(dobavljaci_df.columns)
+            writer = OutputWriter(self.processed_dir, timings=self.timings, source_job=self.job_id)
+            manifest = ClientManifest(self.processed_dir)
+            extraction_inputs = self._extraction_inputs(manifest, extraction_files)
+
+            # Process tables based on type; both types are requested concurrently,
+            # and each result is written in the background as soon as it is ready
+            table_types = [
+                t for t in ('kupci', 'dobavljaci')
+                if table_type is None or table_type.lower() == t
+            ]
+            stage_inputs = {t: self._ai_stage_inputs(t, extraction_inputs, writer.formats) for t in table_types}
+            reused = {}
+            # Turning the cache off asks for fresh AI responses, so earlier outputs do not count either
+            if self.use_cache:
+                for current_type in table_types:
+                    entry = manifest.current(f'ai:{current_type}', stage_inputs[current_type])
+                    if entry is not None:
+                        reused[current_type] = entry
+            to_process = [t for t in table_types if t not in reused]
+
+            def on_result(current_type: str, result: Dict[str, Any]):
+                spools.append(result['spool'])
+                writer.submit_frames(f'{current_type}_processed', result['spool'].frames, result['spool'].columns, key=current_type)
+
+            processed = {}
+            if to_process:
+                processed = self._process_chunked(extraction_files, to_process, on_result=on_result)
+
+            for current_type in table_types:
+                if current_type in reused:
+                    results[current_type] = {**reused[current_type]['result'], 'reused': True}
+                    if self.timings is not None:
+                        self.timings.skip('ai_request', 'write_output')
+                    continue
+                spool = processed[current_type]['spool']
+                results[current_type] = {
+                    'total_rows': spool.rows,
+                    'processed_columns': spool.columns,
+                    'chunks': processed[current_type]['chunks'],
+                    'cached_chunks': processed[current_type]['cached_chunks'],
+                    'reused': False
                 }
-                # Save Dobavljaci to Excel
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                dobavljaci_path = self.processed_dir / f'dobavljaci_processed_{timestamp}.xlsx'
-                dobavljaci_df.to_excel(dobavljaci_path, index=False)
-                output_files['dobavljaci'] = str(dobavljaci_path)
 
             # If both tables were processed, create a merged file
+            merged_inputs = None
+            merged_reused = None
             if table_type is None and 'kupci' in results and 'dobavljaci' in results:
-                # Add a type column to each DataFrame
-                kupci_df['type'] = 'kupci'
-                dobavljaci_df['type'] = 'dobavljaci'
-                
-                # Merge the DataFrames
-                merged_df = pd.concat([kupci_df, dobavljaci_df], ignore_index=True)
-                
-                # Save merged result
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                merged_path = self.processed_dir / f'merged_results_{timestamp}.xlsx'
-                merged_df.to_excel(merged_path, index=False)
-                output_files['merged'] = str(merged_path)
+                merged_inputs = {
+                    t: fingerprint(stage_inputs[t]) for t in ('kupci', 'dobavljaci')
+                }
+                merged_inputs['output_formats'] = writer.formats
+                merged_reused = manifest.current('merged', merged_inputs) if self.use_cache else None
+                if merged_reused is None:
+                    def merged_frames():
+                        # Both tables with a type column, read back piece by piece
+                        for t in ('kupci', 'dobavljaci'):
+                            frames = processed[t]['spool'].frames() if t in processed else self._iter_output(manifest.output_paths(reused[t]))
+                            for df in frames:
+                                yield df.assign(type=t)
+
+                    merged_columns = list(dict.fromkeys(
+                        results['kupci']['processed_columns'] + ['type'] + results['dobavljaci']['processed_columns']
+                    ))
+                    writer.submit_frames('merged_results', merged_frames, merged_columns, key='merged')
+
+            written = writer.wait()
+            for current_type in table_types:
+                if current_type in reused:
+                    written[current_type] = manifest.output_paths(reused[current_type])
+                else:
+                    manifest.record(
+                        f'ai:{current_type}',
+                        stage_inputs[current_type],
+                        written[current_type],
+                        result={k: v for k, v in results[current_type].items() if k != 'reused'}
+                    )
+            if merged_inputs is not None:
+                if merged_reused is not None:
+                    written['merged'] = manifest.output_paths(merged_reused)
+                    if self.timings is not None:
+                        self.timings.skip('write_output')
+                else:
+                    manifest.record('merged', merged_inputs, written['merged'])
+            manifest.save()
+
+            # Timestamped outputs accumulate with every run; drop old ones the manifest no longer refers to
+            pruned = get_file_index(self.processed_dir).prune(manifest.referenced_outputs())
+
+            output_files = {key: paths[0] for key, paths in written.items()}
 
             return {
                 'status': 'success',
                 'message': 'Successfully processed tables',
                 'summary': {
-                    'total_files': len(all_data),
+                    'total_files': len(extraction_files),
                     'results': results,
-                    'output_files': output_files
+                    'output_files': output_files,
+                    'output_files_by_format': written,
+                    'reused': {
+                        'ai': sorted(reused),
+                        'merged': merged_reused is not None
+                    },
+                    'pruned_outputs': pruned
                 }
             }
 
         except Exception as e:
+            # Background writes may still be reading the spools; stop them before the spools are closed
+            if writer is not None:
+                writer.discard()
             return {
                 'status': 'error',
                 'message': f'Error processing tables: {str(e)}'
             }
+        finally:
+            for spool in spools:
+                spool.close()
+
+    def _process_tables_streaming(self, extraction_files: List[Path]) -> Dict[str, Any]:
+        """
+        process_tables for PIPELINE_MODE=streaming.
+
+        The common columns are found from the table schemas, then every
+        extraction is read in batches of STREAM_BATCH_ROWS rows, projected
+        onto the common columns and appended to combined_result.json, so only
+        one batch is held in memory at a time. Missing values are written as
+        null.
+        """
+        schemas = [read_extraction_schema(path) for path in extraction_files]
+        table_structures = self.analyze_table_structure(schemas)
+        common_columns = self.find_common_columns(table_structures)
+        
+        if not common_columns:
+            return {
+                'status': 'error',
+                'message': 'No common columns found between tables'
+            }
+
+        output_path = self.processed_dir / 'combined_result.json'
+        total_rows = 0
+        # Loading, combining and writing are interleaved and timed together
+        with atomic_path(output_path) as tmp_path, Stage('combine', fmt='json', timings=self.timings) as stage, open(tmp_path, 'wb') as f:
+            writer = JSONStreamWriter(f)
+            writer.begin_object()
+            writer.value(common_columns, 'common_columns')
+            writer.value(table_structures, 'table_structures')
+            writer.begin_array('combined_data')
+            for path, schema in zip(extraction_files, schemas):
+                for meta, columns, column_data in iter_extraction_batches(path, common_columns, self.batch_rows):
+                    batch = [{
+                        'filename': schema['filename'],
+                        'tables': [{**meta, 'layout': COLUMNAR, 'columns': columns, 'column_data': column_data}]
+                    }]
+                    combined = self._combine_columns(batch, common_columns)
+                    names = list(combined)
+                    for values in zip(*combined.values()):
+                        writer.value(dict(zip(names, values)))
+                        total_rows += 1
+            writer.end()
+            writer.end()
+            stage.rows = total_rows
+            stage.bytes = f.tell()
+        get_file_index(self.processed_dir).record([output_path], self.job_id)
+
+        return {
+            'status': 'success',
+            'message': 'Successfully combined and analyzed tables',
+            'output_file': str(output_path),
+            'summary': {
+                'total_files': len(extraction_files),
+                'common_columns': common_columns,
+                'total_rows': total_rows
+            }
+        }
 
     def process_tables(self) -> Dict[str, Any]:
         """Process and combine all tables from JSON files."""
         try:
-            # Load all JSON files
-            all_data = self.load_json_files()
-            if not all_data:
+            extraction_files = find_extractions(self.processed_dir)
+            if not extraction_files:
                 return {
                     'status': 'error',
                     'message': 'No processed files found'
                 }
 
+            if self.pipeline_mode == 'streaming':
+                return self._process_tables_streaming(extraction_files)
+
+            # Columnar bundles can be inspected without reading their rows and then
+            # loaded with only the common columns; JSON files have to be read in full
+            columnar = all(path.suffix == BUNDLE_SUFFIX for path in extraction_files)
+            all_data = self.load_table_schemas() if columnar else self.load_json_files()
+
             # Analyze table structures
             table_structures = self.analyze_table_structure(all_data)
             
@@ -229,6 +703,9 @@ class AIProcessor:
                     'message': 'No common columns found between tables'
                 }
 
+            if columnar:
+                all_data = self.load_json_files(columns=common_columns)
+
             # Combine tables
             combined_df = self.combine_tables(all_data, common_columns)
             
@@ -240,8 +717,12 @@ class AIProcessor:
                 'combined_data': combined_df.to_dict(orient='records')
             }
             
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(result_dict, f, ensure_ascii=False, indent=2)
+            with Stage('write_combined', fmt='json', timings=self.timings) as stage:
+                with atomic_path(output_path) as tmp_path, open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(result_dict, f, ensure_ascii=False, indent=2, default=str)
+                stage.rows = len(combined_df)
+                stage.bytes = output_path.stat().st_size
+            get_file_index(self.processed_dir).record([output_path], self.job_id)
 
             return {
                 'status': 'success',
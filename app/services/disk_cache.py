@@ -0,0 +1,147 @@
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+
+@contextmanager
+def atomic_path(target_path: Path) -> Iterator[Path]:
+    """
+    Yield a temporary path that replaces ``target_path`` when the block succeeds.
+
+    The temporary name is unique, so concurrent writers of the same target,
+    in any thread or process, never write into each other's file; the last
+    one to finish wins and readers only ever see complete files.
+    """
+    target_path = Path(target_path)
+    tmp_path = target_path.with_name(f'.{target_path.name}.{uuid.uuid4().hex[:12]}.tmp')
+    try:
+        yield tmp_path
+        os.replace(tmp_path, target_path)
+    finally:
+        if tmp_path.exists():
+            os.remove(tmp_path)
+
+
+def atomic_copy(source_path: Path, target_path: Path):
+    """Copy a file so that readers of ``target_path`` never see a partial copy."""
+    target_path = Path(target_path)
+    fd, tmp_path = tempfile.mkstemp(dir=target_path.parent, prefix='.tmp-')
+    os.close(fd)
+    try:
+        shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class DiskCache:
+    """
+    Size-bounded, file-per-entry cache on local disk.
+
+    Entries are plain files named by their key. Reading an entry refreshes
+    its mtime, and when the total size exceeds ``max_bytes`` the entries with
+    the oldest mtime are removed first (LRU).
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / key
+
+    def get_path(self, key: str) -> Optional[Path]:
+        """Return the path of a cached entry, or None if it is not cached."""
+        path = self._entry_path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put_file(self, key: str, source_path: Path) -> Path:
+        """Copy ``source_path`` into the cache under ``key``."""
+        path = self._entry_path(key)
+        atomic_copy(source_path, path)
+        self.evict()
+        return path
+
+    def put_bytes(self, key: str, data: bytes) -> Path:
+        """Store ``data`` in the cache under ``key``."""
+        path = self._entry_path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+        return path
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self._entry_path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def record(self, hit: bool):
+        """Count a cache lookup."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _entries(self) -> list:
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and not entry.name.startswith('.tmp-'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(entries),
+            'size_bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None
+        }
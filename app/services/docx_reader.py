@@ -0,0 +1,162 @@
+import zipfile
+from itertools import groupby
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    # Imported where a document is parsed, so that importing the app does not load lxml
+    from lxml import etree
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+_BODY = f'{W}body'
+_P = f'{W}p'
+_R = f'{W}r'
+_T = f'{W}t'
+_BR = f'{W}br'
+_BR_TYPE = f'{W}type'
+_HYPERLINK = f'{W}hyperlink'
+_TBL = f'{W}tbl'
+_TR = f'{W}tr'
+_TC = f'{W}tc'
+_TC_PR = f'{W}tcPr'
+_TR_PR = f'{W}trPr'
+_GRID_SPAN = f'{W}gridSpan'
+_V_MERGE = f'{W}vMerge'
+_GRID_BEFORE = f'{W}gridBefore'
+_GRID_AFTER = f'{W}gridAfter'
+_VAL = f'{W}val'
+
+# Run content and its text, as python-docx renders it
+_RUN_TEXT = {
+    f'{W}tab': '\t',
+    f'{W}ptab': '\t',
+    f'{W}cr': '\n',
+    f'{W}noBreakHyphen': '-'
+}
+
+
+def _run_text(run: 'etree._Element') -> str:
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == _T:
+            parts.append(child.text or '')
+        elif tag == _BR:
+            # Page and column breaks carry no text
+            if child.get(_BR_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif tag in _RUN_TEXT:
+            parts.append(_RUN_TEXT[tag])
+    return ''.join(parts)
+
+
+def _paragraph_text(paragraph: 'etree._Element') -> str:
+    parts = []
+    for child in paragraph:
+        if child.tag == _R:
+            parts.append(_run_text(child))
+        elif child.tag == _HYPERLINK:
+            parts.extend(_run_text(run) for run in child.iter(_R))
+    return ''.join(parts)
+
+
+def _cell_values(tc: 'etree._Element') -> List[str]:
+    """
+    Text of a cell, once per grid column it covers.
+
+    A cell spanning several columns (gridSpan) gives its text for the first
+    column and '' for the others; a cell continuing a vertical merge gives ''.
+    Only the cell's own paragraphs count, not those of nested tables.
+    """
+    paragraphs = []
+    span = 1
+    continued = False
+    # Walk the children once: find() and findall() are slow in lxml
+    for child in tc:
+        if child.tag == _P:
+            paragraphs.append(_paragraph_text(child))
+        elif child.tag == _TC_PR:
+            for prop in child:
+                if prop.tag == _GRID_SPAN:
+                    span = max(1, int(prop.get(_VAL, '1')))
+                elif prop.tag == _V_MERGE:
+                    continued = prop.get(_VAL, 'continue') == 'continue'
+    text = '' if continued else '\n'.join(paragraphs).strip()
+    return [text] + [''] * (span - 1)
+
+
+def _grid_skip(tr: 'etree._Element') -> Tuple[int, int]:
+    """Grid columns skipped before and after a row's cells (gridBefore, gridAfter)."""
+    before = after = 0
+    for child in tr:
+        if child.tag == _TR_PR:
+            for prop in child:
+                if prop.tag == _GRID_BEFORE:
+                    before = int(prop.get(_VAL, '0'))
+                elif prop.tag == _GRID_AFTER:
+                    after = int(prop.get(_VAL, '0'))
+            break
+    return before, after
+
+
+def iter_docx_rows(file_path: Path) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Stream the rows of a DOCX file's top-level tables as ``(table_number, cells)``.
+
+    word/document.xml is read with lxml's iterparse and every row is
+    discarded once yielded, so memory stays flat however large the tables
+    are. Tables are numbered from 1 in document order, like python-docx's
+    ``Document.tables``.
+    """
+    from lxml import etree
+
+    with zipfile.ZipFile(file_path) as archive, archive.open('word/document.xml') as document:
+        table_depth = 0
+        table = None
+        table_number = 0
+        cells: List[str] = []
+
+        for event, element in etree.iterparse(document, events=('start', 'end'), tag=(_TBL, _TR, _TC)):
+            if element.tag == _TBL:
+                if event == 'start':
+                    table_depth += 1
+                    if table_depth == 1 and element.getparent().tag == _BODY:
+                        table = element
+                        table_number += 1
+                    continue
+                table_depth -= 1
+                if element is table:
+                    table = None
+                    # Drop the finished table and everything before it
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+                continue
+
+            # Rows and cells of nested tables end while table_depth > 1
+            if event == 'start' or table is None or table_depth != 1:
+                continue
+            if element.tag == _TC:
+                cells.extend(_cell_values(element))
+            else:
+                before, after = _grid_skip(element)
+                row = [''] * before + cells if before else cells
+                if after:
+                    row.extend([''] * after)
+                cells = []
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+                yield table_number, row
+
+
+def iter_docx_tables(file_path: Path) -> Iterator[Tuple[int, Iterator[List[str]]]]:
+    """
+    Yield ``(table_number, rows)`` for each top-level table that has rows.
+
+    ``rows`` is a lazy iterator over the table's rows (header first) and must
+    be consumed before moving on to the next table.
+    """
+    for table_number, rows in groupby(iter_docx_rows(file_path), key=lambda item: item[0]):
+        yield table_number, (cells for _, cells in rows)
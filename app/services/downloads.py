@@ -0,0 +1,195 @@
+import json
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import Response, StreamingResponse
+
+from app.services.file_variants import COMPRESSIBLE_SUFFIXES, available_encodings, compressed_variant
+from app.services.intermediate_store import iter_extraction_rows
+
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('DOWNLOAD_CHUNK_SIZE', str(256 * 1024)))
+# Smaller files are always sent as they are
+MIN_COMPRESS_BYTES = int(os.getenv('DOWNLOAD_MIN_COMPRESS_BYTES', '1024'))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+
+    def opaque(tag: str) -> str:
+        return tag[2:] if tag.startswith('W/') else tag
+
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or opaque(etag) in map(opaque, tags)
+
+
+def choose_encoding(accept_encoding: Optional[str], path: Path, size: int) -> Optional[str]:
+    """The preferred content encoding the client accepts for this file, if it is worth compressing."""
+    if not accept_encoding or path.suffix.lower() not in COMPRESSIBLE_SUFFIXES or size < MIN_COMPRESS_BYTES:
+        return None
+
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range into inclusive ``(start, end)`` offsets.
+
+    Returns None for anything but one byte range, in which case the whole
+    file is sent, and raises ValueError if the range cannot be satisfied.
+    """
+    unit, _, ranges = range_header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in ranges:
+        return None
+    first, dash, last = ranges.strip().partition('-')
+    if not dash:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # bytes=-N is the last N bytes
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end or start < 0:
+        raise ValueError(f'Range not satisfiable: {range_header}')
+    return start, min(end, size - 1)
+
+
+def _not_modified(headers: Headers, etag: str, mtime: float) -> bool:
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _range_applies(headers: Headers, etag: str, last_modified: str) -> bool:
+    """If-Range: only serve a part if the client's copy is still the current one (strong comparison)."""
+    if_range = headers.get('if-range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return if_range == last_modified
+
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+async def _file_chunks(path: Path, start: int, length: int):
+    async with aiofiles.open(path, 'rb') as f:
+        await f.seek(start)
+        while length > 0:
+            chunk = await f.read(min(DOWNLOAD_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+async def file_download(headers: Headers, path: Path, media_type: str, filename: str) -> Response:
+    """
+    Serve a file with validators, ranges and a cached compressed variant.
+
+    The ETag and Last-Modified come from the file's size and mtime and are
+    checked against If-None-Match / If-Modified-Since. JSON and CSV files
+    are sent gzip- or zstd-encoded if the client accepts it, from a copy
+    compressed once and kept until the file changes. A single byte range
+    (honouring If-Range) is answered with 206; ranges refer to the encoded
+    bytes, as HTTP specifies.
+    """
+    path = Path(path)
+    stat = path.stat()
+    encoding = choose_encoding(headers.get('accept-encoding'), path, stat.st_size)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"'
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+    response_headers = {
+        'ETag': etag,
+        'Last-Modified': last_modified,
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding',
+        'Accept-Ranges': 'bytes'
+    }
+    if _not_modified(headers, etag, stat.st_mtime):
+        return Response(status_code=304, headers=response_headers)
+
+    response_headers['Content-Disposition'] = _content_disposition(filename)
+    send_path = path
+    if encoding is not None:
+        send_path = await run_in_threadpool(compressed_variant, path, encoding)
+        response_headers['Content-Encoding'] = encoding
+
+    size = send_path.stat().st_size
+    start, end = 0, size - 1
+    status_code = 200
+    range_header = headers.get('range')
+    if range_header and _range_applies(headers, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**response_headers, 'Content-Range': f'bytes */{size}'})
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            response_headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response_headers['Content-Length'] = str(end - start + 1)
+    return StreamingResponse(
+        _file_chunks(send_path, start, end - start + 1),
+        status_code=status_code,
+        media_type=media_type,
+        headers=response_headers
+    )
+
+
+def iter_json_lines(path: Path, offset: int = 0, limit: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Render an extraction's rows as JSON Lines, one object per row.
+
+    Each line is ``{"row": <index across all tables>, "table": <sheet name or
+    table number>, "data": {...}}``; rows are read batch by batch, so any
+    page of a large bundle is served without loading the whole extraction.
+    """
+    row_number = offset
+    for meta, rows in iter_extraction_rows(path, offset, limit):
+        table = meta.get('sheet_name', meta.get('table_number'))
+        lines = []
+        for row in rows:
+            lines.append(json.dumps({'row': row_number, 'table': table, 'data': row}, ensure_ascii=False, default=str))
+            row_number += 1
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
@@ -0,0 +1,82 @@
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Tuple
+
+from app.services.table_format import unique_columns
+
+# Engines that read a workbook once and yield plain cell values
+#   'openpyxl-readonly': openpyxl in read-only, values-only mode
+#   'calamine':          the Rust-based python-calamine reader, if installed
+FAST_ENGINES = ('openpyxl-readonly', 'calamine')
+
+
+def _rows_to_columns(rows: Iterable[Tuple[Any, ...]]) -> Tuple[List[str], List[list]]:
+    """Turn row tuples (header first) into column names and one value list per column."""
+    header = None
+    column_data: List[list] = []
+    row_count = 0
+
+    for row in rows:
+        if all(value is None or value == '' for value in row):
+            continue
+        if header is None:
+            header = list(row)
+            continue
+        if len(row) > len(column_data):
+            column_data.extend([None] * row_count for _ in range(len(row) - len(column_data)))
+        for idx, column in enumerate(column_data):
+            column.append(row[idx] if idx < len(row) else None)
+        row_count += 1
+
+    if header is None:
+        return [], []
+
+    width = max(len(header), len(column_data))
+    header = header + [None] * (width - len(header))
+    column_data.extend([None] * row_count for _ in range(width - len(column_data)))
+
+    # Drop trailing columns that have neither a header nor any values
+    while width and header[width - 1] in (None, '') and all(v is None for v in column_data[width - 1]):
+        width -= 1
+
+    return unique_columns(header[:width]), column_data[:width]
+
+
+def _iter_openpyxl_readonly(file_path: Path) -> Iterator[Tuple[str, Iterable[Tuple[Any, ...]]]]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield sheet.title, sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_calamine(file_path: Path) -> Iterator[Tuple[str, Iterable[Tuple[Any, ...]]]]:
+    try:
+        from python_calamine import CalamineWorkbook
+    except ImportError:
+        raise ImportError("The 'calamine' Excel engine requires the python-calamine package")
+
+    workbook = CalamineWorkbook.from_path(str(file_path))
+    for sheet_name in workbook.sheet_names:
+        rows = workbook.get_sheet_by_name(sheet_name).to_python(skip_empty_area=False)
+        yield sheet_name, (tuple(None if value == '' else value for value in row) for row in rows)
+
+
+def iter_workbook_columns(file_path: Path, engine: str) -> Iterator[Tuple[str, List[str], List[list]]]:
+    """
+    Open a workbook once and yield ``(sheet_name, columns, column_data)`` per sheet.
+
+    The first non-empty row of each sheet is the header, as with pandas.read_excel.
+    """
+    if engine == 'openpyxl-readonly':
+        sheets = _iter_openpyxl_readonly(file_path)
+    elif engine == 'calamine':
+        sheets = _iter_calamine(file_path)
+    else:
+        raise ValueError(f"Unsupported Excel engine: {engine}")
+
+    for sheet_name, rows in sheets:
+        columns, column_data = _rows_to_columns(rows)
+        yield sheet_name, columns, column_data
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.services.disk_cache import DiskCache, atomic_path
+
+HASH_CHUNK_SIZE = 1024 * 1024
+KEY_SUFFIX = '.key'
+HASH_SUFFIX = '.sha256'
+
+
+def file_sha256(file_path: Path) -> str:
+    """Hash a file in fixed-size chunks without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_record_path(file_path: Path) -> Path:
+    return file_path.with_name(file_path.name + HASH_SUFFIX)
+
+
+def write_hash_record(file_path: Path, content_hash: str):
+    """
+    Store a file's content hash next to it.
+
+    The record also holds the file's size and mtime so that a file replaced
+    by other means is detected and re-hashed.
+    """
+    stat = os.stat(file_path)
+    with atomic_path(_hash_record_path(file_path)) as tmp_path:
+        tmp_path.write_text(f"{content_hash} {stat.st_size} {stat.st_mtime_ns}")
+
+
+def content_hash(file_path: Path) -> str:
+    """Return a file's SHA-256, reusing the hash recorded at upload time when it is still valid."""
+    file_path = Path(file_path)
+    stat = os.stat(file_path)
+    try:
+        digest, size, mtime_ns = _hash_record_path(file_path).read_text().split()
+        if int(size) == stat.st_size and int(mtime_ns) == stat.st_mtime_ns:
+            return digest
+    except (FileNotFoundError, ValueError):
+        pass
+
+    digest = file_sha256(file_path)
+    write_hash_record(file_path, digest)
+    return digest
+
+
+class ExtractionCache(DiskCache):
+    """
+    Content-addressed cache of extraction outputs.
+
+    The key combines the input file's content hash and name (which the
+    output records) with the extractor version and any option that changes
+    the output, so an unchanged upload is never extracted twice. Next to each extraction output in the client's processed
+    directory a ``<output>.key`` file records which key produced it.
+    """
+
+    @staticmethod
+    def cache_key(
+        content_hash: str,
+        extension: str,
+        version: str,
+        options: Optional[Dict[str, Any]] = None,
+        filename: Optional[str] = None
+    ) -> str:
+        fingerprint = json.dumps({
+            'content_hash': content_hash,
+            'extension': extension.lower(),
+            'filename': filename,
+            'version': version,
+            'options': options or {}
+        }, sort_keys=True)
+        return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _key_path(output_path: Path) -> Path:
+        return output_path.with_name(output_path.name + KEY_SUFFIX)
+
+    def output_matches(self, output_path: Path, key: str) -> bool:
+        """Check whether ``output_path`` was produced for ``key``."""
+        try:
+            return output_path.exists() and self._key_path(output_path).read_text() == key
+        except FileNotFoundError:
+            return False
+
+    def mark_output(self, output_path: Path, key: str):
+        """Record that ``output_path`` holds the extraction for ``key``."""
+        with atomic_path(self._key_path(output_path)) as tmp_path:
+            tmp_path.write_text(key)
+
+    def forget_output(self, output_path: Path):
+        """Remove the key record of an output that no longer exists."""
+        try:
+            os.remove(self._key_path(output_path))
+        except FileNotFoundError:
+            pass
+
+    def invalidate_client(self, processed_dir: Path) -> int:
+        """
+        Drop the cached extractions of one client.
+
+        Removes the cache entries referenced by the client's outputs and their
+        key files, so the next run re-extracts every file. The outputs
+        themselves are kept until they are overwritten.
+        """
+        removed = 0
+        if not processed_dir.exists():
+            return removed
+        for key_path in processed_dir.glob(f'*{KEY_SUFFIX}'):
+            self.delete(key_path.read_text().strip())
+            os.remove(key_path)
+            removed += 1
+        return removed
+
+
+_extraction_cache: Optional[ExtractionCache] = None
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Return the process-wide extraction cache."""
+    global _extraction_cache
+    if _extraction_cache is None:
+        _extraction_cache = ExtractionCache(
+            os.getenv('EXTRACTION_CACHE_DIR', str(Path('cache') / 'extraction')),
+            int(os.getenv('EXTRACTION_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+        )
+    return _extraction_cache
@@ -0,0 +1,233 @@
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.services.disk_cache import atomic_path
+from app.services.file_lock import file_lock
+from app.services.file_variants import remove_variants
+from app.services.intermediate_store import BUNDLE_SUFFIX, is_extraction_file
+from app.services.manifest import MANIFEST_NAME
+
+# Kept in a subdirectory, so that saving the index does not change the mtime of the directory it describes
+FILE_INDEX_PATH = Path('.index') / 'files.json'
+# Serializes updates of the index by several worker processes
+FILE_INDEX_LOCK = Path('.index') / 'files.lock'
+FILE_INDEX_VERSION = 1
+
+COMBINED_RESULT_NAME = 'combined_result.json'
+OUTPUT_SUFFIXES = ('.xlsx', '.csv', '.parquet')
+
+# Outputs written by OutputWriter, e.g. kupci_processed_20240101_120000.xlsx
+TIMESTAMPED_OUTPUT = re.compile(r'^(?P<name>.+)_(?P<timestamp>\d{8}_\d{6})(?P<suffix>\.[^.]+)$')
+
+KINDS = ('extraction', 'combined', 'json', 'processed')
+
+
+def file_kind(path: Path) -> Optional[str]:
+    """What a file in a processed directory is, or None if it is not listed."""
+    name = path.name
+    if name.startswith('.') or name == MANIFEST_NAME:
+        return None
+    if is_extraction_file(path):
+        return 'extraction'
+    if name == COMBINED_RESULT_NAME:
+        return 'combined'
+    suffix = path.suffix.lower()
+    if suffix == '.json':
+        return 'json'
+    if suffix in OUTPUT_SUFFIXES:
+        return 'processed'
+    return None
+
+
+def listed_name(name: str, kind: str) -> str:
+    """Binary extractions are listed under the JSON name they are exported as."""
+    if kind == 'extraction' and name.endswith(BUNDLE_SUFFIX):
+        return f'{name[:-len(BUNDLE_SUFFIX)]}.json'
+    return name
+
+
+class FileIndex:
+    """
+    Metadata of the files in one client's processed directory.
+
+    Stored as ``.index/files.json`` in the directory. Writers record their
+    outputs with the job that produced them; files added, replaced or
+    removed by anything else are picked up by a rescan whenever the
+    directory's mtime differs from the one the index was built at, so a
+    listing normally costs one stat call instead of a directory walk.
+    """
+
+    def __init__(self, processed_dir: Path):
+        self.processed_dir = Path(processed_dir)
+        self.path = self.processed_dir / FILE_INDEX_PATH
+        self._lock = threading.Lock()
+        self._file_lock_path = self.processed_dir / FILE_INDEX_LOCK
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._dir_mtime_ns: Optional[int] = None
+        # mtime of the index file when it was last loaded or saved, to notice other processes' updates
+        self._loaded_mtime_ns: Optional[int] = None
+
+    @staticmethod
+    def _mtime_ns(path: Path) -> Optional[int]:
+        try:
+            return path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        mtime_ns = self._mtime_ns(self.path)
+        if mtime_ns is None or mtime_ns == self._loaded_mtime_ns:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get('version') == FILE_INDEX_VERSION:
+            self._files = data.get('files', {})
+            self._dir_mtime_ns = data.get('dir_mtime_ns')
+        self._loaded_mtime_ns = mtime_ns
+
+    def _save(self):
+        self.path.parent.mkdir(exist_ok=True)
+        with atomic_path(self.path) as tmp_path, open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'version': FILE_INDEX_VERSION, 'dir_mtime_ns': self._dir_mtime_ns, 'files': self._files},
+                f, ensure_ascii=False, indent=2
+            )
+        self._loaded_mtime_ns = self._mtime_ns(self.path)
+
+    @staticmethod
+    def _entry(path: Path, kind: str, stat: os.stat_result, source_job: Optional[str]) -> Dict[str, Any]:
+        return {
+            'name': listed_name(path.name, kind),
+            'kind': kind,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            'source_job': source_job
+        }
+
+    def _rescan(self):
+        files = {}
+        with os.scandir(self.processed_dir) as entries:
+            for dir_entry in entries:
+                kind = file_kind(Path(dir_entry.name))
+                if kind is None or not dir_entry.is_file():
+                    continue
+                stat = dir_entry.stat()
+                known = self._files.get(dir_entry.name)
+                if known is not None and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                    files[dir_entry.name] = known
+                else:
+                    files[dir_entry.name] = self._entry(Path(dir_entry.name), kind, stat, None)
+        self._files = files
+
+    def _reconcile(self) -> bool:
+        """Rescan the directory if it changed since the index was built; return whether it did."""
+        self._load()
+        dir_mtime_ns = self._mtime_ns(self.processed_dir)
+        if dir_mtime_ns is None or dir_mtime_ns == self._dir_mtime_ns:
+            return False
+        self._rescan()
+        self._dir_mtime_ns = dir_mtime_ns
+        return True
+
+    def record(self, paths: Iterable[str], source_job: Optional[str] = None):
+        """Add or update the entries of files that were just written."""
+        with self._lock, file_lock(self._file_lock_path):
+            self._load()
+            for path in map(Path, paths):
+                kind = file_kind(path)
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if kind is not None:
+                    self._files[path.name] = self._entry(path, kind, stat, source_job)
+            self._save()
+
+    def list(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """All entries, newest first, after picking up changes made outside the index."""
+        with self._lock, file_lock(self._file_lock_path):
+            if self._reconcile():
+                self._save()
+            entries = [
+                {key: value for key, value in entry.items() if key != 'mtime_ns'}
+                for entry in self._files.values()
+                if kind is None or entry['kind'] == kind
+            ]
+        return sorted(entries, key=lambda entry: (entry['created_at'], entry['name']), reverse=True)
+
+    def prune(
+        self,
+        protected: Set[str],
+        keep: Optional[int] = None,
+        max_age_days: Optional[float] = None
+    ) -> List[str]:
+        """
+        Delete old timestamped outputs and return their names.
+
+        Outputs are grouped by name and format (kupci_processed/.xlsx, ...).
+        Of each group the ``keep`` newest are kept (OUTPUT_RETENTION_KEEP,
+        default 10; 0 keeps all), and older ones are also deleted once they
+        are more than ``max_age_days`` old (OUTPUT_RETENTION_DAYS, default 0
+        = no age limit). The newest output of a group and any file in
+        ``protected`` are never deleted.
+        """
+        if keep is None:
+            keep = int(os.getenv('OUTPUT_RETENTION_KEEP', '10'))
+        if max_age_days is None:
+            max_age_days = float(os.getenv('OUTPUT_RETENTION_DAYS', '0'))
+        if keep <= 0 and max_age_days <= 0:
+            return []
+
+        with self._lock, file_lock(self._file_lock_path):
+            self._reconcile()
+            groups: Dict[tuple, List[tuple]] = {}
+            for name, entry in self._files.items():
+                match = TIMESTAMPED_OUTPUT.match(name)
+                if entry['kind'] == 'processed' and match:
+                    groups.setdefault((match['name'], match['suffix']), []).append((match['timestamp'], name))
+
+            cutoff = time.time() - max_age_days * 86400
+            removed = []
+            for outputs in groups.values():
+                outputs.sort(reverse=True)
+                for position, (_, name) in enumerate(outputs[1:], 1):
+                    too_many = keep > 0 and position >= keep
+                    too_old = max_age_days > 0 and self._files[name]['mtime_ns'] / 1e9 < cutoff
+                    if name in protected or not (too_many or too_old):
+                        continue
+                    try:
+                        os.remove(self.processed_dir / name)
+                    except FileNotFoundError:
+                        pass
+                    remove_variants(self.processed_dir / name)
+                    del self._files[name]
+                    removed.append(name)
+
+            if removed:
+                # The entries already reflect our own deletions
+                self._dir_mtime_ns = self._mtime_ns(self.processed_dir)
+                self._save()
+        return sorted(removed)
+
+
+_indexes: Dict[Path, FileIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_file_index(processed_dir: Path) -> FileIndex:
+    """The shared index of a client's processed directory."""
+    key = Path(processed_dir).resolve()
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = FileIndex(key)
+        return _indexes[key]
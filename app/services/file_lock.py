@@ -0,0 +1,78 @@
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_NAME = '.lock'
+
+
+class LockTimeout(Exception):
+    """Raised when a lock could not be acquired in time."""
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: Path, timeout: Optional[float] = None, poll_interval: float = 0.1) -> Iterator[None]:
+    """
+    Hold an exclusive lock on ``path`` for the duration of the block.
+
+    The lock is taken with flock (msvcrt.locking on Windows) on a file
+    opened for this call, so it excludes other threads as well as other
+    processes, and the operating system releases it if the process dies.
+
+    Args:
+        timeout: Optional; seconds to wait before raising LockTimeout (None waits forever)
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not _try_lock(fd):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise LockTimeout(f"Timed out after {timeout} s waiting for {path}")
+            time.sleep(poll_interval)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def client_lock(processed_dir: Path, timeout: Optional[float] = None):
+    """
+    Lock a client's folders against concurrent processing runs.
+
+    Every worker process takes this lock before extracting and processing a
+    client's files, so two runs never write the same outputs at once.
+    CLIENT_LOCK_TIMEOUT (seconds, default 3600) bounds the wait.
+    """
+    if timeout is None:
+        timeout = float(os.getenv('CLIENT_LOCK_TIMEOUT', '3600'))
+    return file_lock(Path(processed_dir) / LOCK_NAME, timeout)
@@ -0,0 +1,107 @@
+import gzip
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List
+
+from app.services.intermediate_store import export_json
+
+try:
+    import zstandard
+except ImportError:  # optional; gzip is always available
+    zstandard = None
+
+# Derived copies of a file live in this subdirectory of its folder
+VARIANTS_DIR = '.variants'
+
+ENCODING_SUFFIXES = {
+    'zstd': '.zst',
+    'gzip': '.gz'
+}
+
+# Formats that are not compressed already
+COMPRESSIBLE_SUFFIXES = ('.json', '.csv')
+
+
+def available_encodings() -> List[str]:
+    """Content encodings that can be produced, in order of preference."""
+    return [encoding for encoding in ENCODING_SUFFIXES if encoding != 'zstd' or zstandard is not None]
+
+
+def variant_path(path: Path, suffix: str) -> Path:
+    path = Path(path)
+    # Variants of variants (a compressed bundle export) sit next to the variant
+    folder = path.parent if path.parent.name == VARIANTS_DIR else path.parent / VARIANTS_DIR
+    return folder / f'{path.name}{suffix}'
+
+
+def _is_current(variant: Path, source_mtime_ns: int) -> bool:
+    try:
+        return variant.stat().st_mtime_ns == source_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def _write_variant(path: Path, variant: Path, write):
+    """
+    Write a variant of ``path`` atomically and stamp it with the source's mtime.
+
+    A variant is current as long as its mtime equals the source's, so a
+    replaced source is never served from a stale variant.
+    """
+    stat = path.stat()
+    variant.parent.mkdir(exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=variant.parent, prefix=f'.{variant.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.utime(tmp_name, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_name, variant)
+    finally:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+
+
+def compressed_variant(path: Path, encoding: str) -> Path:
+    """
+    Return the ``encoding``-compressed copy of ``path``, compressing it on first use.
+
+    The copy is cached in the VARIANTS_DIR next to the file and reused until
+    the file changes.
+    """
+    path = Path(path)
+    variant = variant_path(path, ENCODING_SUFFIXES[encoding])
+    if _is_current(variant, path.stat().st_mtime_ns):
+        return variant
+
+    def write(f):
+        with open(path, 'rb') as source:
+            if encoding == 'zstd':
+                with zstandard.ZstdCompressor(level=3).stream_writer(f, closefd=False) as compressor:
+                    shutil.copyfileobj(source, compressor, 1024 * 1024)
+            else:
+                with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=6, mtime=0) as compressor:
+                    shutil.copyfileobj(source, compressor, 1024 * 1024)
+
+    _write_variant(path, variant, write)
+    return variant
+
+
+def exported_json(bundle_path: Path) -> Path:
+    """Return the JSON export of a table bundle, rendering it on first use."""
+    bundle_path = Path(bundle_path)
+    variant = variant_path(bundle_path, '.json')
+    if not _is_current(variant, bundle_path.stat().st_mtime_ns):
+        _write_variant(bundle_path, variant, lambda f: f.write(export_json(bundle_path)))
+    return variant
+
+
+def remove_variants(path: Path):
+    """Delete every cached variant of a file that is being removed."""
+    compressed = list(ENCODING_SUFFIXES.values())
+    for suffix in compressed + ['.json'] + [f'.json{suffix}' for suffix in compressed]:
+        try:
+            os.remove(variant_path(path, suffix))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,480 @@
+import json
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.disk_cache import atomic_path
+from app.services.json_writer import JSONStreamWriter
+from app.services.table_format import COLUMNAR, NUM_ROWS, columnar_table, is_batched, is_columnar, iter_table_rows, table_columns, table_meta, table_row_count
+
+JSON = 'json'
+ARROW = 'arrow'
+PARQUET = 'parquet'
+FORMATS = (JSON, ARROW, PARQUET)
+
+SOURCE_EXTENSIONS = ('.xlsx', '.pdf', '.docx')
+JSON_SUFFIX = '.json'
+BUNDLE_SUFFIX = '.tables'
+
+# A table bundle stores every table of one extraction in a single file:
+#
+#   [segment 1][segment 2]...[index JSON][index length: uint64 LE][magic]
+#
+# Each segment is a complete Arrow IPC stream or Parquet file holding one
+# table, or one batch of rows of a table that was written while it was
+# being extracted. The index records each table's columns and metadata and
+# the offset, length and row count of its segments. Bundles are
+# memory-mapped on read, so Arrow segments are used in place.
+_MAGIC = b'TBLBNDL1'
+_FOOTER = struct.Struct('<Q8s')
+
+
+def output_path_for(processed_dir: Path, filename: str, fmt: str) -> Path:
+    """Path of the extraction output for an uploaded file in the given format."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported intermediate format: {fmt}")
+    suffix = JSON_SUFFIX if fmt == JSON else BUNDLE_SUFFIX
+    return Path(processed_dir) / f"{filename}{suffix}"
+
+
+def is_extraction_file(path: Path) -> bool:
+    """Extraction outputs are named after the upload, e.g. kraj-fiskalne-kupci.xlsx.json."""
+    name = path.name.lower()
+    for suffix in (JSON_SUFFIX, BUNDLE_SUFFIX):
+        if name.endswith(suffix):
+            return name[:-len(suffix)].endswith(SOURCE_EXTENSIONS)
+    return False
+
+
+def source_filename(path: Path) -> str:
+    """Name of the uploaded file an extraction output was produced from."""
+    return Path(path).name.rsplit('.', 1)[0]
+
+
+def find_extractions(processed_dir: Path) -> List[Path]:
+    """
+    List extraction outputs in a processed directory, one per uploaded file.
+
+    If an upload was extracted in more than one format, the newest output wins.
+    """
+    newest: Dict[str, Path] = {}
+    for path in Path(processed_dir).iterdir():
+        if not path.is_file() or not is_extraction_file(path):
+            continue
+        source = source_filename(path)
+        if source not in newest or path.stat().st_mtime > newest[source].stat().st_mtime:
+            newest[source] = path
+    return [newest[source] for source in sorted(newest)]
+
+
+# Arrow types of the numeric schema types
+_ARROW_TYPES = {
+    'float64': 'float64',
+    'int32': 'int32',
+    'int64': 'int64',
+    'bool': 'bool_'
+}
+
+
+def _write_atomic(path: Path, write):
+    with atomic_path(path) as tmp_path, open(tmp_path, 'wb') as f:
+        write(f)
+
+
+def _to_arrow_array(values: list, dtype: Optional[str] = None):
+    """
+    Build an Arrow array, typed by the table's schema type if it has one
+    (see schema_inference): numbers keep their inferred width, dates are
+    stored as date32 and categorical text is dictionary-encoded.
+    """
+    import pyarrow as pa
+
+    try:
+        if dtype in _ARROW_TYPES:
+            return pa.array(values, type=getattr(pa, _ARROW_TYPES[dtype])())
+        if dtype == 'date':
+            return pa.array(values, type=pa.string()).cast(pa.date32())
+        if dtype == 'category':
+            return pa.array(values, type=pa.string()).dictionary_encode()
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, OverflowError):
+        # A value that does not fit the schema; store the column as if it had none
+        pass
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        # Mixed-type columns (common in spreadsheets) are stored as text
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def _to_arrow_table(table: Dict[str, Any]):
+    import pyarrow as pa
+
+    schema = table.get('schema') or {}
+    columns = table_columns(table)
+    if is_columnar(table):
+        column_data = table['column_data']
+    else:
+        # Rows may not all have the same keys; use the union in first-seen order
+        seen = dict.fromkeys(columns)
+        for row in table.get('data', []):
+            seen.update(dict.fromkeys(row))
+        columns = list(seen)
+        column_data = [[row.get(col) for row in table['data']] for col in columns]
+    return pa.Table.from_arrays(
+        [_to_arrow_array(values, schema.get(col)) for col, values in zip(columns, column_data)],
+        names=[str(c) for c in columns]
+    )
+
+
+def _arrow_tables(table: Dict[str, Any]) -> Iterator[Any]:
+    """One Arrow table per segment: the whole table, or each batch of a batched table."""
+    import pyarrow as pa
+
+    if not is_batched(table):
+        yield _to_arrow_table(table)
+        return
+    names = [str(c) for c in table['columns']]
+    dtypes = [(table.get('schema') or {}).get(col) for col in table['columns']]
+    for column_data in table['batches']:
+        yield pa.Table.from_arrays([_to_arrow_array(values, dtype) for values, dtype in zip(column_data, dtypes)], names=names)
+
+
+def _write_bundle(f, tables: Iterable[Dict[str, Any]], filename: str, fmt: str):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    index = {'filename': filename, 'format': fmt, 'tables': []}
+    for table in tables:
+        entry = {'meta': table_meta(table), 'columns': None, 'rows': 0, 'segments': []}
+        for arrow_table in _arrow_tables(table):
+            offset = f.tell()
+            if fmt == ARROW:
+                with pa.ipc.new_stream(f, arrow_table.schema) as writer:
+                    writer.write_table(arrow_table)
+            else:
+                pq.write_table(arrow_table, f)
+            if entry['columns'] is None:
+                entry['columns'] = arrow_table.column_names
+            entry['rows'] += arrow_table.num_rows
+            entry['segments'].append({'offset': offset, 'length': f.tell() - offset, 'rows': arrow_table.num_rows})
+        entry['columns'] = entry['columns'] or []
+        index['tables'].append(entry)
+
+    index_bytes = json.dumps(index, ensure_ascii=False, default=str).encode('utf-8')
+    f.write(index_bytes)
+    f.write(_FOOTER.pack(len(index_bytes), _MAGIC))
+
+
+def _write_json(f, tables: Iterable[Dict[str, Any]], filename: str):
+    writer = JSONStreamWriter(f)
+    writer.begin_object()
+    writer.value(filename, 'filename')
+    writer.begin_array('tables')
+    for table in tables:
+        if not is_batched(table):
+            writer.value(table)
+            continue
+        # Rows of a batched table are written as they are read
+        writer.begin_object()
+        for key, value in table_meta(table).items():
+            writer.value(value, key)
+        writer.begin_array('data')
+        columns = table['columns']
+        for column_data in table['batches']:
+            for values in zip(*column_data):
+                writer.value(dict(zip(columns, values)))
+        writer.end()
+        writer.end()
+    writer.end()
+    writer.end()
+
+
+def write_extraction(output_path: Path, filename: str, tables: Iterable[Dict[str, Any]], fmt: str):
+    """
+    Atomically write the tables extracted from ``filename``.
+
+    ``tables`` may be a generator, and tables may use the batches layout;
+    either way each table is written as it comes and then released.
+    """
+    output_path = Path(output_path)
+    if fmt == JSON:
+        _write_atomic(output_path, lambda f: _write_json(f, tables, filename))
+    else:
+        _write_atomic(output_path, lambda f: _write_bundle(f, tables, filename, fmt))
+
+
+def _read_index(buffer) -> Dict[str, Any]:
+    index_length, magic = _FOOTER.unpack(buffer.slice(buffer.size - _FOOTER.size).to_pybytes())
+    if magic != _MAGIC:
+        raise ValueError("Not a table bundle")
+    start = buffer.size - _FOOTER.size - index_length
+    return json.loads(buffer.slice(start, index_length).to_pybytes().decode('utf-8'))
+
+
+def _column_values(column) -> list:
+    """Python values of an Arrow column; date32 columns are returned as 'YYYY-MM-DD', as the JSON format stores them."""
+    import pyarrow as pa
+
+    if pa.types.is_date32(column.type):
+        column = column.cast(pa.string())
+    return column.to_pylist()
+
+
+def _segments(entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Bundles written before tables could span several segments store one offset per table
+    return entry.get('segments') or [{'offset': entry['offset'], 'length': entry['length']}]
+
+
+def _project(columns: List[str], wanted: Optional[Iterable[str]]) -> List[str]:
+    if wanted is None:
+        return columns
+    wanted = {col.lower() for col in wanted}
+    return [col for col in columns if col.lower() in wanted]
+
+
+def _columnar_from_meta(meta: Dict[str, Any], columns: List[str], column_data: List[list]) -> Dict[str, Any]:
+    name_key = 'sheet_name' if 'sheet_name' in meta else 'table_number'
+    table = columnar_table(name_key, meta.get(name_key), columns, column_data)
+    table.update({k: v for k, v in meta.items() if k != name_key})
+    return table
+
+
+def read_extraction(path: Path, columns: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Read an extraction output in any format.
+
+    Args:
+        path: Extraction output (.json or .tables bundle)
+        columns: Optional; only return these columns (matched case-insensitively).
+            Arrow bundles are read in place from the memory map and Parquet
+            bundles decode only the requested columns. Tables that have
+            none of them keep their row count (see table_format).
+
+    Returns the usual ``{'filename', 'tables'}`` dict. Tables read from a
+    bundle use the columnar layout.
+    """
+    path = Path(path)
+    if path.suffix == JSON_SUFFIX:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if columns is not None:
+            for table in data['tables']:
+                keep = _project(table_columns(table), columns)
+                if is_columnar(table):
+                    if not keep:
+                        table[NUM_ROWS] = table_row_count(table)
+                    positions = [table['columns'].index(col) for col in keep]
+                    table['column_data'] = [table['column_data'][i] for i in positions]
+                    table['columns'] = keep
+                else:
+                    table['data'] = [{col: row.get(col) for col in keep} for row in table['data']]
+        return data
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with pa.memory_map(str(path), 'r') as source:
+        buffer = source.read_buffer()
+    index = _read_index(buffer)
+
+    tables = []
+    for entry in index['tables']:
+        keep = _project(entry['columns'], columns)
+        column_data = [[] for _ in keep]
+        num_rows = 0
+        for segment_entry in _segments(entry):
+            segment = buffer.slice(segment_entry['offset'], segment_entry['length'])
+            if index['format'] == ARROW:
+                arrow_table = pa.ipc.open_stream(segment).read_all().select(keep)
+            else:
+                arrow_table = pq.read_table(pa.BufferReader(segment), columns=keep)
+            num_rows += arrow_table.num_rows
+            for values, column in zip(column_data, arrow_table.columns):
+                values.extend(_column_values(column))
+        table = _columnar_from_meta(entry['meta'], keep, column_data)
+        if not keep:
+            table[NUM_ROWS] = num_rows
+        tables.append(table)
+
+    return {'filename': index['filename'], 'tables': tables}
+
+
+def _segment_batches(buffer, fmt: str, segment_entry: Dict[str, Any], columns: List[str], batch_rows: int) -> Iterator[Any]:
+    """Decode one bundle segment as record batches of at most ``batch_rows`` rows."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    segment = buffer.slice(segment_entry['offset'], segment_entry['length'])
+    if fmt == ARROW:
+        return (
+            small_batch
+            for record_batch in pa.ipc.open_stream(segment)
+            for small_batch in pa.Table.from_batches([record_batch]).select(columns).to_batches(max_chunksize=batch_rows)
+        )
+    return pq.ParquetFile(pa.BufferReader(segment)).iter_batches(batch_size=batch_rows, columns=columns)
+
+
+def iter_extraction_batches(
+    path: Path,
+    columns: Optional[Iterable[str]] = None,
+    batch_rows: int = 10000,
+    skip_rows: int = 0
+) -> Iterator[Tuple[Dict[str, Any], List[str], List[list]]]:
+    """
+    Read an extraction output in batches of at most ``batch_rows`` rows.
+
+    Yields ``(meta, columns, column_data)`` per batch, where ``meta`` is the
+    table's metadata (see ``table_meta``). Batches of a table that has none
+    of the requested columns have no columns; their ``meta`` then holds the
+    batch's row count under 'num_rows'. Bundles are read one record batch
+    at a time from the memory map, so memory use depends on the batch size
+    only; JSON files are parsed whole and then sliced.
+
+    Args:
+        columns: Optional; only return these columns (matched case-insensitively)
+        skip_rows: Optional; start after this many rows, counted across tables.
+            Bundle segments that lie entirely before are not decoded.
+    """
+    path = Path(path)
+    if path.suffix == JSON_SUFFIX:
+        for table in read_extraction(path, columns)['tables']:
+            meta = table_meta(table)
+            names = table_columns(table)
+            row_count = table_row_count(table)
+            if skip_rows >= row_count:
+                skip_rows -= row_count
+                continue
+            first, skip_rows = skip_rows, 0
+            if not names:
+                for start in range(first, row_count, batch_rows):
+                    yield {**meta, NUM_ROWS: min(batch_rows, row_count - start)}, names, []
+            elif is_columnar(table):
+                column_data = table['column_data']
+                for start in range(first, row_count, batch_rows):
+                    yield meta, names, [values[start:start + batch_rows] for values in column_data]
+            else:
+                rows = table.get('data', [])
+                for start in range(first, row_count, batch_rows):
+                    batch = rows[start:start + batch_rows]
+                    yield meta, names, [[row.get(col) for row in batch] for col in names]
+        return
+
+    import pyarrow as pa
+
+    with pa.memory_map(str(path), 'r') as source:
+        buffer = source.read_buffer()
+    index = _read_index(buffer)
+
+    for entry in index['tables']:
+        keep = _project(entry['columns'], columns)
+        segments = _segments(entry)
+        for segment_entry in segments:
+            # Single-segment bundles written before segments were introduced only count rows per table
+            segment_rows = segment_entry.get('rows', entry.get('rows') if len(segments) == 1 else None)
+            if segment_rows is not None and skip_rows >= segment_rows:
+                skip_rows -= segment_rows
+                continue
+            for record_batch in _segment_batches(buffer, index['format'], segment_entry, keep, batch_rows):
+                if skip_rows >= record_batch.num_rows:
+                    skip_rows -= record_batch.num_rows
+                    continue
+                if skip_rows:
+                    record_batch, skip_rows = record_batch.slice(skip_rows), 0
+                meta = entry['meta'] if keep else {**entry['meta'], NUM_ROWS: record_batch.num_rows}
+                yield meta, keep, [_column_values(column) for column in record_batch.columns]
+
+
+def iter_extraction_tables(path: Path, batch_rows: int = 10000) -> Iterator[Tuple[str, Dict[str, Any], Iterator[Dict[str, Any]]]]:
+    """
+    Read an extraction output table by table.
+
+    Yields ``(filename, meta, rows)`` per table, where ``rows`` iterates
+    over the table's rows as dicts and must be consumed before the next
+    table is read. Bundles are decoded ``batch_rows`` rows at a time; JSON
+    files are parsed whole.
+    """
+    path = Path(path)
+    if path.suffix == JSON_SUFFIX:
+        data = read_extraction(path)
+        for table in data['tables']:
+            yield data['filename'], table_meta(table), iter_table_rows(table)
+        return
+
+    import pyarrow as pa
+
+    with pa.memory_map(str(path), 'r') as source:
+        buffer = source.read_buffer()
+    index = _read_index(buffer)
+
+    def rows(entry):
+        for segment_entry in _segments(entry):
+            for record_batch in _segment_batches(buffer, index['format'], segment_entry, entry['columns'], batch_rows):
+                names = record_batch.schema.names
+                for values in zip(*(_column_values(column) for column in record_batch.columns)):
+                    yield dict(zip(names, values))
+
+    for entry in index['tables']:
+        yield index['filename'], entry['meta'], rows(entry)
+
+
+def iter_extraction_rows(
+    path: Path,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    batch_rows: int = 1000
+) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    Read the rows of an extraction in order, counted across its tables.
+
+    Yields ``(meta, rows)`` per batch of row dicts, starting at row
+    ``offset`` and stopping after ``limit`` rows (all if None).
+    """
+    remaining = limit
+    for meta, names, column_data in iter_extraction_batches(path, batch_rows=batch_rows, skip_rows=offset):
+        rows = [dict(zip(names, values)) for values in zip(*column_data)]
+        if remaining is not None:
+            rows = rows[:remaining]
+            remaining -= len(rows)
+        if rows:
+            yield meta, rows
+        if remaining == 0:
+            return
+
+
+def read_extraction_schema(path: Path) -> Dict[str, Any]:
+    """
+    Read only the table names and columns of an extraction.
+
+    For bundles this touches nothing but the index; JSON files have to be
+    parsed in full.
+    """
+    path = Path(path)
+    if path.suffix == JSON_SUFFIX:
+        data = read_extraction(path)
+        tables = [
+            {**table_meta(table), 'layout': COLUMNAR, 'columns': table_columns(table), 'column_data': []}
+            for table in data['tables']
+        ]
+        return {'filename': data['filename'], 'tables': tables}
+
+    import pyarrow as pa
+
+    with pa.memory_map(str(path), 'r') as source:
+        index = _read_index(source.read_buffer())
+    return {
+        'filename': index['filename'],
+        'tables': [
+            {**entry['meta'], 'layout': COLUMNAR, 'columns': entry['columns'], 'column_data': []}
+            for entry in index['tables']
+        ]
+    }
+
+
+def export_json(path: Path) -> bytes:
+    """Render any extraction output as the pretty-printed JSON document the JSON format writes."""
+    data = read_extraction(path)
+    data['tables'] = [
+        {**table_meta(table), 'data': list(iter_table_rows(table))}
+        for table in data['tables']
+    ]
+    return json.dumps(data, ensure_ascii=False, indent=2, default=str).encode('utf-8')
@@ -0,0 +1,263 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from app.services.job_store import JobStore, get_job_store, worker_alive, worker_id
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class Job:
+    """State of a single background processing job."""
+
+    def __init__(self, job_id: str, client_name: str, params: Dict[str, Any]):
+        self.job_id = job_id
+        self.client_name = client_name
+        self.params = params
+        self.status = 'queued'
+        self.stage = None
+        self.files: List[Dict[str, Any]] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.timings: Dict[str, float] = {}
+        # Worker process running the job, see job_store.worker_id
+        self.worker = worker_id()
+        # Called after every change, to publish the job to other workers
+        self.on_change: Optional[Callable[['Job'], None]] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Job':
+        """Rebuild a read-only snapshot of a job from ``to_dict`` output."""
+        def parse(value: Optional[str]) -> Optional[datetime]:
+            return datetime.fromisoformat(value) if value else None
+
+        job = cls(data['job_id'], data['client_name'], data.get('params') or {})
+        job.status = data['status']
+        job.stage = data.get('stage')
+        job.files = list(data.get('progress', {}).get('files', []))
+        job.result = data.get('result')
+        job.error = data.get('error')
+        job.created_at = parse(data['created_at'])
+        job.started_at = parse(data.get('started_at'))
+        job.finished_at = parse(data.get('finished_at'))
+        job.timings = dict(data.get('timings') or {})
+        job.worker = data.get('worker')
+        return job
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def set_stage(self, stage: str):
+        """Mark the start of a pipeline stage."""
+        with self._lock:
+            self.stage = stage
+        self._changed()
+
+    def record_timing(self, stage: str, seconds: float):
+        """Record how long a pipeline stage took."""
+        with self._lock:
+            self.timings[stage] = round(seconds, 4)
+
+    def file_finished(self, result: Dict[str, Any]):
+        """Record the extraction result of a single file."""
+        with self._lock:
+            self.files.append(result)
+        self._changed()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            duration = None
+            if self.started_at:
+                end = self.finished_at or datetime.now()
+                duration = round((end - self.started_at).total_seconds(), 4)
+            return {
+                'job_id': self.job_id,
+                'client_name': self.client_name,
+                'worker': self.worker,
+                'status': self.status,
+                'stage': self.stage,
+                'params': self.params,
+                'progress': {
+                    'files_done': len(self.files),
+                    'files': list(self.files)
+                },
+                'timings': dict(self.timings),
+                'created_at': self.created_at.isoformat(),
+                'started_at': self.started_at.isoformat() if self.started_at else None,
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+                'duration_seconds': duration,
+                'result': self.result,
+                'error': self.error
+            }
+
+
+class JobManager:
+    """
+    Runs processing jobs in a bounded thread pool.
+
+    At most ``max_workers`` jobs run at once across all clients and at most
+    ``max_per_client`` for any single client; extra jobs for a busy client
+    wait in a per-client queue until one of its running jobs finishes.
+
+    These limits apply per worker process. Every job is also published to
+    the shared job store (see get_job_store), so that any worker can report
+    on jobs running in the others.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_per_client: Optional[int] = None,
+        max_queued: Optional[int] = None,
+        history_limit: Optional[int] = None,
+        store: Optional[JobStore] = None
+    ):
+        self.max_workers = max_workers or int(os.getenv('MAX_CONCURRENT_JOBS', '4'))
+        self.max_per_client = max_per_client or int(os.getenv('MAX_JOBS_PER_CLIENT', '1'))
+        self.max_queued = max_queued or int(os.getenv('JOB_QUEUE_LIMIT', '100'))
+        self.history_limit = history_limit or int(os.getenv('JOB_HISTORY_LIMIT', '200'))
+        self.store = store if store is not None else get_job_store()
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._finished: Deque[str] = deque()
+        self._running: Dict[str, int] = {}
+        self._pending: Dict[str, Deque] = {}
+
+    def submit(self, client_name: str, target: Callable[[Job], Dict[str, Any]], params: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        Queue ``target(job)`` for execution and return the job immediately.
+
+        The value returned by ``target`` becomes the job result; a result with
+        ``status == 'error'`` or a raised exception marks the job as failed.
+        """
+        job = Job(uuid.uuid4().hex, client_name, params or {})
+        job.on_change = self._publish
+
+        with self._lock:
+            queued = sum(1 for j in self._jobs.values() if j.status in ('queued', 'running'))
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"Job queue is full ({self.max_queued} jobs)")
+
+            self._jobs[job.job_id] = job
+            if self._running.get(client_name, 0) < self.max_per_client:
+                self._dispatch(job, target)
+            else:
+                self._pending.setdefault(client_name, deque()).append((job, target))
+
+        self._publish(job)
+        return job
+
+    def _publish(self, job: Job):
+        if self.store is None:
+            return
+        try:
+            self.store.save(job.to_dict())
+        except sqlite3.Error:
+            # The job is still tracked in memory by this worker
+            pass
+
+    def _from_store(self, data: Dict[str, Any]) -> Job:
+        job = Job.from_dict(data)
+        if job.status not in ('completed', 'failed') and not worker_alive(job.worker):
+            job.status = 'failed'
+            job.error = 'The worker running the job exited before it finished'
+            job.stage = None
+            self._publish(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            data = self.store.get(job_id)
+            if data is not None:
+                job = self._from_store(data)
+        return job
+
+    def list_jobs(self, client_name: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            jobs = {job.job_id: job for job in self._jobs.values()}
+        if self.store is not None:
+            for data in self.store.list(client_name):
+                if data['job_id'] not in jobs:
+                    jobs[data['job_id']] = self._from_store(data)
+        jobs = list(jobs.values())
+        if client_name is not None:
+            jobs = [job for job in jobs if job.client_name == client_name]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _dispatch(self, job: Job, target: Callable[[Job], Dict[str, Any]]):
+        # Caller must hold self._lock
+        self._running[job.client_name] = self._running.get(job.client_name, 0) + 1
+        self._executor.submit(self._run, job, target)
+
+    def _run(self, job: Job, target: Callable[[Job], Dict[str, Any]]):
+        job.status = 'running'
+        job.started_at = datetime.now()
+        self._publish(job)
+        start = time.perf_counter()
+
+        try:
+            result = target(job)
+            job.result = result
+            job.status = 'failed' if result and result.get('status') == 'error' else 'completed'
+        except Exception as e:
+            # The traceback stays in the server log; job results are served to clients and persisted
+            logger.exception('Job %s for %s failed', job.job_id, job.client_name)
+            job.error = str(e)
+            job.result = {
+                'status': 'error',
+                'message': f'Job failed: {str(e)}'
+            }
+            job.status = 'failed'
+        finally:
+            job.record_timing('total', time.perf_counter() - start)
+            job.finished_at = datetime.now()
+            job.set_stage(None)
+            self._on_finished(job)
+
+    def _on_finished(self, job: Job):
+        with self._lock:
+            client_name = job.client_name
+            self._running[client_name] -= 1
+            if self._running[client_name] <= 0:
+                del self._running[client_name]
+
+            pending = self._pending.get(client_name)
+            if pending:
+                next_job, next_target = pending.popleft()
+                if not pending:
+                    del self._pending[client_name]
+                self._dispatch(next_job, next_target)
+
+            self._finished.append(job.job_id)
+            while len(self._finished) > self.history_limit:
+                self._jobs.pop(self._finished.popleft(), None)
+
+        self._publish(job)
+        if self.store is not None:
+            try:
+                self.store.prune(self.history_limit)
+            except sqlite3.Error:
+                pass
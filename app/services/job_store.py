@@ -0,0 +1,118 @@
+import json
+import os
+import socket
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+FINISHED_STATUSES = ('completed', 'failed')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    client_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    finished_at TEXT,
+    worker TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_client ON jobs (client_name, created_at);
+"""
+
+
+def worker_id() -> str:
+    """Identifies this worker process, e.g. ``web-1:4242``."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def worker_alive(worker: Optional[str]) -> bool:
+    """
+    Whether the worker that owns a job still runs.
+
+    Only processes on this host can be checked, and only on POSIX (on
+    Windows, os.kill would terminate the process); others are assumed alive.
+    """
+    if not worker or os.name != 'posix':
+        return True
+    host, _, pid = worker.rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore:
+    """
+    Job records shared by all worker processes, in a SQLite database.
+
+    Each job is stored as the JSON of ``Job.to_dict`` and replaced in a
+    single transaction whenever it changes, so every worker can answer
+    /jobs requests for jobs that run in another one. WAL mode lets readers
+    proceed while a job is being written.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per call: sqlite3 connections cannot be shared between threads by default
+        return sqlite3.connect(self.path, timeout=30)
+
+    def save(self, record: Dict[str, Any]):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO jobs (job_id, client_name, status, created_at, finished_at, worker, data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    record['job_id'], record['client_name'], record['status'], record['created_at'],
+                    record.get('finished_at'), record.get('worker'), json.dumps(record, default=str)
+                )
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT data FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list(self, client_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Job records, newest first."""
+        query = 'SELECT data FROM jobs'
+        params: tuple = ()
+        if client_name is not None:
+            query += ' WHERE client_name = ?'
+            params = (client_name,)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query + ' ORDER BY created_at DESC', params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def prune(self, keep: int):
+        """Keep only the ``keep`` most recently finished jobs."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                'DELETE FROM jobs WHERE status IN (?, ?) AND job_id NOT IN ('
+                'SELECT job_id FROM jobs WHERE status IN (?, ?) ORDER BY finished_at DESC LIMIT ?)',
+                (*FINISHED_STATUSES, *FINISHED_STATUSES, keep)
+            )
+
+
+def get_job_store() -> Optional[JobStore]:
+    """
+    The job store configured by JOB_STORE ('sqlite', the default, or 'memory').
+
+    With 'memory', jobs are only known to the worker that runs them, which
+    is enough for a single worker process.
+    """
+    if os.getenv('JOB_STORE', 'sqlite') == 'memory':
+        return None
+    return JobStore(Path(os.getenv('JOB_STORE_PATH', str(Path('processed') / '.jobs.sqlite3'))))
@@ -0,0 +1,58 @@
+import json
+from typing import Any, BinaryIO, List, Optional
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, indent=2, default=str)
+
+
+class JSONStreamWriter:
+    """
+    Write a JSON document piece by piece, in the layout of ``json.dump(..., indent=2)``.
+
+    Objects and arrays are opened with ``begin_object``/``begin_array`` and
+    closed with ``end``; ``value`` writes a complete value into the innermost
+    container. Only the value being written is held in memory, and the
+    output is byte-for-byte what json.dump would produce for the whole
+    document.
+    """
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        # Number of items written so far in each open container
+        self._counts: List[int] = []
+        self._closers: List[str] = []
+
+    def _write(self, text: str):
+        self.f.write(text.encode('utf-8'))
+
+    def _start_item(self, key: Optional[str]):
+        if self._counts:
+            self._write(',' if self._counts[-1] else '')
+            self._write('\n' + '  ' * len(self._counts))
+            self._counts[-1] += 1
+        if key is not None:
+            self._write(_dumps(key) + ': ')
+
+    def _begin(self, opener: str, closer: str, key: Optional[str]):
+        self._start_item(key)
+        self._write(opener)
+        self._counts.append(0)
+        self._closers.append(closer)
+
+    def begin_object(self, key: Optional[str] = None):
+        self._begin('{', '}', key)
+
+    def begin_array(self, key: Optional[str] = None):
+        self._begin('[', ']', key)
+
+    def value(self, value: Any, key: Optional[str] = None):
+        self._start_item(key)
+        self._write(_dumps(value).replace('\n', '\n' + '  ' * len(self._counts)))
+
+    def end(self):
+        count = self._counts.pop()
+        closer = self._closers.pop()
+        if count:
+            self._write('\n' + '  ' * len(self._counts))
+        self._write(closer)
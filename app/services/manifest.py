@@ -0,0 +1,86 @@
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from app.services.disk_cache import atomic_path
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def fingerprint(value: Any) -> str:
+    """Stable hash of a JSON-serializable value."""
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ClientManifest:
+    """
+    Per-client record of which inputs produced each stage's outputs.
+
+    Stored as ``manifest.json`` in the client's processed directory. Every
+    stage entry (e.g. ``extraction:<upload>``, ``ai:kupci``, ``merged``)
+    holds the inputs it was computed from, their fingerprint and the output
+    files, so a stage whose inputs did not change can be skipped as long as
+    its outputs still exist.
+    """
+
+    def __init__(self, processed_dir: Path):
+        self.processed_dir = Path(processed_dir)
+        self.path = self.processed_dir / MANIFEST_NAME
+        self.stages: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        if data.get('version') != MANIFEST_VERSION:
+            return {}
+        return data.get('stages', {})
+
+    def get(self, stage: str) -> Optional[Dict[str, Any]]:
+        return self.stages.get(stage)
+
+    def current(self, stage: str, inputs: Any) -> Optional[Dict[str, Any]]:
+        """Return the stage's entry if it was computed from ``inputs`` and all its outputs still exist."""
+        entry = self.stages.get(stage)
+        if entry is None or entry.get('fingerprint') != fingerprint(inputs):
+            return None
+        if not all((self.processed_dir / name).exists() for name in entry.get('outputs', [])):
+            return None
+        return entry
+
+    def record(self, stage: str, inputs: Any, outputs: List[str], **details: Any):
+        """
+        Record that ``outputs`` were computed from ``inputs``.
+
+        Args:
+            outputs: Output paths; stored relative to the processed directory
+            details: Anything else worth keeping with the stage, e.g. its result summary
+        """
+        self.stages[stage] = {
+            'inputs': inputs,
+            'fingerprint': fingerprint(inputs),
+            'outputs': [Path(output).name for output in outputs],
+            'updated_at': datetime.now().isoformat(),
+            **details
+        }
+
+    def remove(self, stage: str):
+        self.stages.pop(stage, None)
+
+    def output_paths(self, entry: Dict[str, Any]) -> List[str]:
+        return [str(self.processed_dir / name) for name in entry.get('outputs', [])]
+
+    def referenced_outputs(self) -> Set[str]:
+        """Names of all files some stage's entry relies on."""
+        return {name for entry in self.stages.values() for name in entry.get('outputs', [])}
+
+    def save(self):
+        """Atomically write the manifest."""
+        with atomic_path(self.path) as tmp_path, open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'stages': self.stages}, f, ensure_ascii=False, indent=2, default=str)
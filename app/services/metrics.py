@@ -0,0 +1,304 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(12))          # 1 KiB .. 4 GiB
+ROWS_BUCKETS = (10, 100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+STAGE_LABELS = ('stage', 'file_type', 'format')
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """A Prometheus-style histogram with fixed buckets and a fixed set of label names."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in sorted(series):
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, key))
+            prefix = f'{labels},' if labels else ''
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {_format_value(total)}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+STAGE_SECONDS = Histogram('table_pipeline_stage_seconds', 'Time spent in a pipeline stage.', STAGE_LABELS, SECONDS_BUCKETS)
+STAGE_BYTES = Histogram('table_pipeline_stage_bytes', 'Bytes read or written by a pipeline stage.', STAGE_LABELS, BYTES_BUCKETS)
+STAGE_ROWS = Histogram('table_pipeline_stage_rows', 'Table rows handled by a pipeline stage.', STAGE_LABELS, ROWS_BUCKETS)
+STAGE_RSS_GROWTH = Histogram(
+    'table_pipeline_stage_rss_growth_bytes',
+    'Peak growth of the process resident memory over its value at the start of a pipeline stage.',
+    STAGE_LABELS,
+    BYTES_BUCKETS
+)
+
+_HISTOGRAMS = (STAGE_SECONDS, STAGE_BYTES, STAGE_ROWS, STAGE_RSS_GROWTH)
+
+PEAK_RSS = 'process_peak_rss_bytes'
+
+# How often the resident memory is sampled while a stage runs
+RSS_SAMPLE_SECONDS = 0.01
+
+STARTUP_SECONDS = 'app_startup_seconds'
+# Seconds per startup phase of this worker process, see record_startup
+_startup_phases: Dict[str, float] = {}
+
+
+def current_rss_bytes() -> Optional[int]:
+    """This process's resident memory right now; Linux only (from /proc/self/statm)."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """
+    High-water mark of this process's resident memory, if the platform reports it.
+
+    This covers the whole life of the process, so it only says something
+    about one stage in a process that runs nothing else (see ``Stage`` for
+    the peak memory of a single stage).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def observe_stage(record: Dict[str, Any]):
+    """Add a stage record (see ``Stage.to_dict``) to the process-wide histograms."""
+    labels = {name: record.get(name) or '' for name in STAGE_LABELS}
+    STAGE_SECONDS.observe(record['seconds'], **labels)
+    if record.get('bytes') is not None:
+        STAGE_BYTES.observe(record['bytes'], **labels)
+    if record.get('rows') is not None:
+        STAGE_ROWS.observe(record['rows'], **labels)
+    if record.get('rss_growth_bytes') is not None:
+        STAGE_RSS_GROWTH.observe(record['rss_growth_bytes'], **labels)
+
+
+def record_startup(phases: Dict[str, float]):
+    """Set the duration of this process's startup phases (import, prewarm_*, total)."""
+    _startup_phases.update(phases)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for histogram in _HISTOGRAMS:
+        lines.extend(histogram.render())
+    peak = peak_rss_bytes()
+    if peak is not None:
+        lines.extend([f'# HELP {PEAK_RSS} Peak resident memory of this worker process since it started.', f'# TYPE {PEAK_RSS} gauge', f'{PEAK_RSS} {peak}'])
+    if _startup_phases:
+        lines.extend([f'# HELP {STARTUP_SECONDS} Time this worker process spent in a startup phase.', f'# TYPE {STARTUP_SECONDS} gauge'])
+        for phase, seconds in sorted(_startup_phases.items()):
+            lines.append(f'{STARTUP_SECONDS}{{phase="{_escape(phase)}"}} {_format_value(float(seconds))}')
+    return '\n'.join(lines) + '\n'
+
+
+class StageTimings:
+    """
+    Totals per stage for one processing run, reported in the job result.
+
+    Stages a run did not need, because their output was reused, are
+    counted as ``skipped`` with zero time, so that every run reports the
+    same stages.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _totals(self, stage: str) -> Dict[str, Any]:
+        return self._stages.setdefault(stage, {'count': 0, 'skipped': 0, 'seconds': 0.0, 'rows': 0, 'bytes': 0})
+
+    def add(self, record: Dict[str, Any]):
+        with self._lock:
+            totals = self._totals(record['stage'])
+            totals['count'] += 1
+            totals['seconds'] += record['seconds']
+            totals['rows'] += record.get('rows') or 0
+            totals['bytes'] += record.get('bytes') or 0
+            # The highest values of a single run of the stage
+            for key in ('peak_rss_bytes', 'rss_growth_bytes'):
+                if record.get(key) is not None:
+                    totals[key] = max(totals.get(key, 0), record[key])
+
+    def skip(self, *stages: str):
+        """Count one skipped run of each of ``stages``."""
+        with self._lock:
+            for stage in stages:
+                self._totals(stage)['skipped'] += 1
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                stage: {**totals, 'seconds': round(totals['seconds'], 4)}
+                for stage, totals in self._stages.items()
+            }
+
+
+class _RssSampler:
+    """Samples the process's resident memory on a background thread while any stage is running."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stages = set()
+        self._lock = threading.Lock()
+        self._running = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, stage: 'Stage'):
+        with self._lock:
+            self._stages.add(stage)
+            # Also after a fork, which leaves the child without the thread
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='stage-rss', daemon=True)
+                self._thread.start()
+            self._running.notify()
+
+    def remove(self, stage: 'Stage'):
+        with self._lock:
+            self._stages.discard(stage)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._stages:
+                    self._running.wait()
+                stages = list(self._stages)
+            rss = current_rss_bytes()
+            if rss is not None:
+                for stage in stages:
+                    stage._observe_rss(rss)
+            time.sleep(self.interval)
+
+
+_rss_sampler = _RssSampler(RSS_SAMPLE_SECONDS)
+
+
+class Stage:
+    """
+    Time one pipeline stage.
+
+    Used as a context manager; set ``rows`` and ``bytes`` inside the block
+    when they are known. On exit the stage is added to the process-wide
+    histograms and to ``timings``, unless ``record=False`` (for stages
+    measured in a worker process and recorded by the parent).
+
+    While the stage runs, the process's resident memory is sampled every
+    RSS_SAMPLE_SECONDS; ``peak_rss_bytes`` is the highest value seen and
+    ``rss_growth_bytes`` how far that is above the value at the start.
+    Shorter spikes can be missed, and other threads of the process count
+    as well.
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        file_type: str = '',
+        fmt: str = '',
+        timings: Optional[StageTimings] = None,
+        record: bool = True
+    ):
+        self.stage = stage
+        self.file_type = file_type.lstrip('.').lower()
+        self.format = fmt
+        self.timings = timings
+        self.record = record
+        self.rows: Optional[int] = None
+        self.bytes: Optional[int] = None
+        self.seconds = 0.0
+        self.peak_rss_bytes: Optional[int] = None
+        self.rss_growth_bytes: Optional[int] = None
+
+    def _observe_rss(self, rss: int):
+        if rss > self.peak_rss_bytes:
+            self.peak_rss_bytes = rss
+
+    def __enter__(self) -> 'Stage':
+        self._start_rss = self.peak_rss_bytes = current_rss_bytes()
+        if self._start_rss is not None:
+            _rss_sampler.add(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._start
+        if self._start_rss is not None:
+            _rss_sampler.remove(self)
+            end_rss = current_rss_bytes()
+            if end_rss is not None:
+                self._observe_rss(end_rss)
+            self.rss_growth_bytes = self.peak_rss_bytes - self._start_rss
+        if exc_type is None and self.record:
+            record_stage(self.to_dict(), self.timings)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'stage': self.stage,
+            'file_type': self.file_type,
+            'format': self.format,
+            'seconds': round(self.seconds, 6),
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'peak_rss_bytes': self.peak_rss_bytes,
+            'rss_growth_bytes': self.rss_growth_bytes
+        }
+
+
+def record_stage(record: Dict[str, Any], timings: Optional[StageTimings] = None):
+    """Add a finished stage to the histograms and, if given, to a run's timings."""
+    observe_stage(record)
+    if timings is not None:
+        timings.add(record)
@@ -0,0 +1,346 @@
+import os
+import pickle
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.disk_cache import atomic_path
+from app.services.file_index import get_file_index
+from app.services.metrics import Stage, StageTimings
+
+if TYPE_CHECKING:
+    # Imported where outputs are written; main only needs MEDIA_TYPES
+    import pandas as pd
+    import pyarrow as pa
+
+OUTPUT_FORMATS = ('xlsx', 'csv', 'parquet')
+
+MEDIA_TYPES = {
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.csv': 'text/csv',
+    '.parquet': 'application/vnd.apache.parquet'
+}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv('OUTPUT_WRITER_WORKERS', '2')),
+                thread_name_prefix='output-writer'
+            )
+        return _executor
+
+
+def _excel_engine() -> str:
+    try:
+        import xlsxwriter  # noqa: F401
+        return 'xlsxwriter'
+    except ImportError:
+        return 'openpyxl'
+
+
+def _write_xlsx(df: 'pd.DataFrame', path: Path):
+    import pandas as pd
+
+    with pd.ExcelWriter(path, engine=_excel_engine()) as writer:
+        df.to_excel(writer, index=False)
+
+
+def _write_csv(df: 'pd.DataFrame', path: Path):
+    # utf-8-sig so that Excel shows Serbian characters correctly
+    df.to_csv(path, index=False, encoding='utf-8-sig')
+
+
+def _write_parquet(df: 'pd.DataFrame', path: Path):
+    try:
+        df.to_parquet(path, index=False)
+    except (TypeError, ValueError):
+        # Columns mixing numbers and text cannot be stored as one Parquet type
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].map(lambda v: None if v is None or v != v else str(v))
+        df.to_parquet(path, index=False)
+
+
+_WRITERS = {
+    'xlsx': _write_xlsx,
+    'csv': _write_csv,
+    'parquet': _write_parquet
+}
+
+# Writers that take a callable returning the DataFrames to write one after
+# the other (called again for every pass over them) and the column names
+FramesFactory = Callable[[], Iterable['pd.DataFrame']]
+
+
+def _frame_rows(df: 'pd.DataFrame', columns: List[str]) -> Iterator[Tuple]:
+    """Rows of ``df`` as tuples of Python values in ``columns`` order, with None for missing values."""
+    df = df.reindex(columns=columns)
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def _stream_xlsx(frames: FramesFactory, columns: List[str], path: Path) -> int:
+    rows = 0
+    try:
+        import xlsxwriter
+    except ImportError:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet()
+        worksheet.append(columns)
+        for df in frames():
+            for row in _frame_rows(df, columns):
+                worksheet.append(row)
+                rows += 1
+        workbook.save(path)
+        return rows
+
+    # constant_memory flushes every row to disk once the next one is started
+    workbook = xlsxwriter.Workbook(str(path), {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+        'remove_timezone': True
+    })
+    worksheet = workbook.add_worksheet()
+    worksheet.write_row(0, 0, columns, workbook.add_format({'bold': True, 'border': 1, 'align': 'center'}))
+    for df in frames():
+        for row in _frame_rows(df, columns):
+            rows += 1
+            worksheet.write_row(rows, 0, row)
+    workbook.close()
+    return rows
+
+
+def _stream_csv(frames: FramesFactory, columns: List[str], path: Path) -> int:
+    import pandas as pd
+
+    rows = 0
+    # utf-8-sig writes the BOM once, before the header
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        pd.DataFrame(columns=columns).to_csv(f, index=False)
+        for df in frames():
+            df.reindex(columns=columns).to_csv(f, header=False, index=False)
+            rows += len(df)
+    return rows
+
+
+def _arrow_type(values) -> 'pa.DataType':
+    import pyarrow as pa
+
+    try:
+        return pa.array(values, from_pandas=True).type
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        return pa.string()
+
+
+def _common_arrow_type(types: Iterable['pa.DataType']) -> 'pa.DataType':
+    """A Parquet type for a column whose frames have ``types``: numbers widen to float64, anything else mixed is text."""
+    import pyarrow as pa
+
+    types = {t for t in types if not pa.types.is_null(t)}
+    if not types:
+        return pa.null()
+    if len(types) == 1:
+        return types.pop()
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+        return pa.float64()
+    return pa.string()
+
+
+def _stream_parquet(frames: FramesFactory, columns: List[str], path: Path) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # A Parquet file has one schema, so the frames are read twice: once to find
+    # a type that fits every frame, once to write them
+    types: Dict[str, set] = {col: set() for col in columns}
+    for df in frames():
+        for col in df.columns:
+            if col in types:
+                types[col].add(_arrow_type(df[col]))
+    schema = pa.schema([(str(col), _common_arrow_type(types[col])) for col in columns])
+
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for df in frames():
+            arrays = []
+            for col, field in zip(columns, schema):
+                if col not in df.columns:
+                    arrays.append(pa.nulls(len(df), field.type))
+                    continue
+                try:
+                    array = pa.array(df[col], from_pandas=True)
+                except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+                    array = None
+                if array is None or (pa.types.is_string(field.type) and not (pa.types.is_string(array.type) or pa.types.is_null(array.type))):
+                    # Text, as _write_parquet stores mixed columns
+                    array = pa.array([None if v is None or v != v else str(v) for v in df[col]], type=pa.string())
+                arrays.append(array.cast(field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows += len(df)
+    return rows
+
+
+_STREAM_WRITERS = {
+    'xlsx': _stream_xlsx,
+    'csv': _stream_csv,
+    'parquet': _stream_parquet
+}
+
+
+class FrameSpool:
+    """
+    DataFrames kept on disk in the order they are appended.
+
+    Results that arrive in pieces (such as the AI response of every chunk)
+    are appended here instead of being held in memory, and written out with
+    ``OutputWriter.submit_frames``. The spool is a hidden temporary file in
+    ``directory`` that ``close`` removes.
+    """
+
+    def __init__(self, directory: Path):
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix='.spool-', suffix='.tmp')
+        self._file = os.fdopen(fd, 'wb')
+        self.rows = 0
+        # Union of all frames' columns in first-seen order, as pandas.concat builds it
+        self._columns: Dict[str, None] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def append(self, df: 'pd.DataFrame'):
+        pickle.dump(df, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.rows += len(df)
+        self._columns.update(dict.fromkeys(df.columns))
+
+    def finish(self):
+        """Stop appending; the frames can be read from now on."""
+        self._file.close()
+
+    def frames(self) -> Iterator['pd.DataFrame']:
+        with open(self.path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def close(self):
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class OutputWriter:
+    """
+    Output stage for processed results.
+
+    Every submitted DataFrame is written exactly once per configured format
+    (OUTPUT_FORMATS, default xlsx) on a shared background thread pool, so
+    writing overlaps with whatever the caller does next. Files are written
+    to a temporary name and renamed into place. Call ``wait`` to collect
+    the written paths; they are then added to the directory's file index.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        formats: Optional[List[str]] = None,
+        timings: Optional[StageTimings] = None,
+        source_job: Optional[str] = None
+    ):
+        self.output_dir = Path(output_dir)
+        self.timings = timings
+        # Recorded in the file index with every written file
+        self.source_job = source_job
+        if formats is None:
+            formats = [fmt.strip() for fmt in os.getenv('OUTPUT_FORMATS', 'xlsx').split(',') if fmt.strip()]
+        unknown = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+        if unknown:
+            raise ValueError(f"Unsupported output formats: {', '.join(unknown)}")
+        self.formats = formats
+        self.timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self._futures: Dict[str, List[Future]] = {}
+
+    def submit(self, name: str, df: 'pd.DataFrame', key: Optional[str] = None):
+        """
+        Queue ``df`` to be written as ``<name>_<timestamp>.<format>``.
+
+        The written paths are reported by ``wait`` under ``key`` (default: ``name``).
+        The DataFrame must not be modified afterwards.
+        """
+        executor = _get_executor()
+        for fmt in self.formats:
+            path = self.output_dir / f'{name}_{self.timestamp}.{fmt}'
+            self._futures.setdefault(key or name, []).append(executor.submit(self._write, fmt, df, path))
+
+    def submit_frames(self, name: str, frames: FramesFactory, columns: List[str], key: Optional[str] = None):
+        """
+        Like ``submit``, for a result given as a sequence of DataFrames.
+
+        ``frames`` is called once per format (twice for parquet) and must
+        return the DataFrames in order; they are written one by one, so the
+        whole result is never in memory. Every file has ``columns``, and
+        frames that lack one of them leave it empty.
+        """
+        executor = _get_executor()
+        for fmt in self.formats:
+            path = self.output_dir / f'{name}_{self.timestamp}.{fmt}'
+            self._futures.setdefault(key or name, []).append(executor.submit(self._write_frames, fmt, frames, columns, path))
+
+    def _write_frames(self, fmt: str, frames: FramesFactory, columns: List[str], path: Path) -> str:
+        with atomic_path(path) as tmp_path, Stage('write_output', fmt=fmt, timings=self.timings) as stage:
+            stage.rows = _STREAM_WRITERS[fmt](frames, columns, tmp_path)
+            stage.bytes = tmp_path.stat().st_size
+        return str(path)
+
+    def _write(self, fmt: str, df: 'pd.DataFrame', path: Path) -> str:
+        with atomic_path(path) as tmp_path, Stage('write_output', fmt=fmt, timings=self.timings) as stage:
+            _WRITERS[fmt](df, tmp_path)
+            stage.rows = len(df)
+            stage.bytes = tmp_path.stat().st_size
+        return str(path)
+
+    def wait(self) -> Dict[str, List[str]]:
+        """Block until all submitted writes finish and return the written paths per key."""
+        written = {
+            name: [future.result() for future in futures]
+            for name, futures in self._futures.items()
+        }
+        self._futures = {}
+        get_file_index(self.output_dir).record(
+            [path for paths in written.values() for path in paths],
+            self.source_job
+        )
+        return written
+
+    def discard(self):
+        """
+        Abandon the writes not yet collected by ``wait``.
+
+        Queued writes are cancelled, running ones are waited for (they may
+        still be reading the caller's data) and the files they wrote are
+        deleted.
+        """
+        futures = [future for futures in self._futures.values() for future in futures]
+        self._futures = {}
+        for future in futures:
+            if future.cancel():
+                continue
+            try:
+                path = future.result()
+            except Exception:
+                continue
+            Path(path).unlink(missing_ok=True)
@@ -0,0 +1,82 @@
+import importlib.util
+import re
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Numbers as they appear in fiscal reports: 1.234,56 / 1,234.56 / 2023 / 31.12.2023.
+_NUMBER = re.compile(r'\d[\d.,]*')
+
+# tabula starts its in-process JVM on first use, and concurrent first calls race in jpype.startJVM
+_jvm_lock = threading.Lock()
+_jvm_started = False
+
+
+def detect_table_pages(file_path: Path, min_table_lines: int = 2) -> Tuple[int, Optional[List[int]]]:
+    """
+    Count the pages of a PDF and find the ones that look like they hold a table.
+
+    A page qualifies when at least ``min_table_lines`` lines of its text
+    contain a number, so that tables with a single amount column count too;
+    pages of plain text are skipped.
+
+    Returns ``(page_count, table_pages)`` with 1-based page numbers.
+    ``table_pages`` is None when the pages cannot be judged, e.g. a scanned
+    PDF without any text layer, and ``page_count`` is 0 when the file
+    cannot be read at all.
+    """
+    import PyPDF2
+
+    try:
+        reader = PyPDF2.PdfReader(str(file_path))
+        page_count = len(reader.pages)
+    except Exception:
+        return 0, None
+
+    table_pages = []
+    has_text = False
+    for number, page in enumerate(reader.pages, start=1):
+        try:
+            text = page.extract_text() or ''
+        except Exception:
+            # Be conservative: let tabula look at pages PyPDF2 cannot parse
+            table_pages.append(number)
+            continue
+        has_text = has_text or bool(text.strip())
+        numeric_lines = sum(1 for line in text.splitlines() if _NUMBER.search(line))
+        if numeric_lines >= min_table_lines:
+            table_pages.append(number)
+
+    return page_count, table_pages if has_text or table_pages else None
+
+
+def page_ranges(pages: List[int], pages_per_range: int) -> List[Tuple[int, int]]:
+    """Group sorted page numbers into runs of consecutive pages, at most ``pages_per_range`` long."""
+    ranges = []
+    for page in pages:
+        if ranges and page == ranges[-1][1] + 1 and page - ranges[-1][0] < pages_per_range:
+            ranges[-1] = (ranges[-1][0], page)
+        else:
+            ranges.append((page, page))
+    return ranges
+
+
+def format_page_ranges(ranges: List[Tuple[int, int]]) -> str:
+    """Page ranges in tabula's ``pages`` syntax, e.g. '1-3,5'."""
+    return ','.join(str(first) if first == last else f'{first}-{last}' for first, last in ranges)
+
+
+def tabula_in_process() -> bool:
+    """Whether tabula can use an in-process JVM (JPype) instead of starting Java for every call."""
+    return importlib.util.find_spec('jpype') is not None
+
+
+def start_tabula_jvm():
+    """Start tabula's in-process JVM, once per process, before tabula is called from several threads."""
+    global _jvm_started
+    with _jvm_lock:
+        if not _jvm_started:
+            from app.services.warmup import warm_jvm
+
+            warm_jvm()
+            _jvm_started = True
@@ -0,0 +1,318 @@
+import os
+import re
+from itertools import chain
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from app.services.table_format import columnar_table, is_batched, is_columnar, table_columns, table_meta, unique_columns
+
+# Column types recorded in a table's 'schema':
+#   'int32', 'int64', 'float64', 'bool': numbers (ints with missing values are float64)
+#   'date':     dates, stored as 'YYYY-MM-DD' strings (date32 in table bundles)
+#   'category': text with few distinct values
+#   'string':   other text
+#   'datetime': date and time values, as read from a spreadsheet
+#   'object':   anything else, e.g. numbers mixed with text
+SCHEMA_KEY = 'schema'
+
+# Numbers formatted the Serbian way: 1.234.567,89 / -1234,5 / 1.234
+_LOCALE_NUMBER = r'[-+]?(?:[1-9]\d{0,2}(?:\.\d{3})+|\d+)(?:,\d+)?'
+# Codes such as 00123 must keep their leading zeros
+_LEADING_ZERO = r'[-+]?0\d'
+# 31.12.2023 or 31.12.2023.
+_LOCALE_DATE = r'\d{1,2}\.\d{1,2}\.\d{4}\.?'
+_ISO_DATE = r'\d{4}-\d{2}-\d{2}'
+
+_WHITESPACE = re.compile(r'\s+')
+
+_INT32 = np.iinfo(np.int32)
+
+
+def category_max_ratio() -> float:
+    """Text columns with at most this share of distinct values become categorical (SCHEMA_CATEGORY_RATIO)."""
+    return float(os.getenv('SCHEMA_CATEGORY_RATIO', '0.5'))
+
+
+def normalize_columns(columns: List[Any]) -> List[str]:
+    """
+    Clean up column names: line breaks and runs of whitespace (common in
+    PDF and Word headers) become a single space and the ends are trimmed.
+    Blank and repeated names are then made unique as by ``unique_columns``.
+    """
+    return unique_columns([
+        None if name is None else _WHITESPACE.sub(' ', str(name)).strip()
+        for name in columns
+    ])
+
+
+def _compact_ints(values: pd.Series) -> Tuple[pd.Series, str]:
+    if len(values) and (values.min() < _INT32.min or values.max() > _INT32.max):
+        return values.astype('int64'), 'int64'
+    return values.astype('int32'), 'int32'
+
+
+def _all_match(values, pattern: str) -> bool:
+    return pc.all(pc.match_substring_regex(values, f'^(?:{pattern})$')).as_py()
+
+
+def _any_match(values, pattern: str) -> bool:
+    return pc.any(pc.match_substring_regex(values, pattern)).as_py()
+
+
+def _any_contains(values, substring: str) -> bool:
+    return pc.any(pc.match_substring(values, substring)).as_py()
+
+
+def _parse_text(series: pd.Series) -> Optional[Tuple[pd.Series, str]]:
+    """
+    Parse a column of strings as locale-formatted numbers or dates.
+
+    Every non-blank value has to parse, otherwise None is returned and the
+    column stays text. Columns of bare digits without any separator are
+    left alone too: in these reports they are codes (PIB, sifra, konto).
+    The column is matched and converted with Arrow compute kernels rather
+    than per-value Python calls.
+    """
+    text = pc.utf8_trim_whitespace(pa.array(series.to_numpy(dtype=object), type=pa.string(), from_pandas=True))
+    # Blank cells count as missing
+    text = pc.if_else(pc.equal(text, ''), pa.scalar(None, pa.string()), text)
+    values = text.drop_null()
+    if not len(values):
+        return None
+    # Text columns usually give themselves away in their first values
+    sample = values.slice(0, 100)
+    patterns = (_LOCALE_NUMBER, _LOCALE_DATE, _ISO_DATE)
+    if not any(_all_match(sample, pattern) for pattern in patterns):
+        return None
+
+    if _all_match(values, _LOCALE_NUMBER):
+        has_decimals = _any_contains(values, ',')
+        if _any_match(values, '^' + _LEADING_ZERO) or not (has_decimals or _any_contains(values, '.')):
+            return None
+        # Arrow's casts accept '-1234' but not '+1234'
+        numbers = pc.replace_substring_regex(text, pattern=r'^\+', replacement='')
+        numbers = pc.replace_substring(pc.replace_substring(numbers, '.', ''), ',', '.')
+        try:
+            if text.null_count == 0 and not has_decimals:
+                return _compact_ints(pd.Series(pc.cast(numbers, pa.int64()).to_numpy(), index=series.index))
+            return pd.Series(pc.cast(numbers, pa.float64()).to_numpy(zero_copy_only=False), index=series.index), 'float64'
+        except pa.ArrowInvalid:
+            # E.g. an integer beyond int64; keep the column as text
+            return None
+
+    for pattern, date_format in ((_LOCALE_DATE, '%d.%m.%Y'), (_ISO_DATE, '%Y-%m-%d')):
+        if _all_match(values, pattern):
+            # pandas rejects impossible dates such as 31.02.2023, which Arrow's strptime rolls over
+            dates = pd.to_datetime(
+                pc.utf8_rtrim(text, characters='.').to_numpy(zero_copy_only=False),
+                format=date_format,
+                errors='coerce'
+            )
+            if dates.isna().sum() != text.null_count:
+                return None
+            return pd.Series(dates, index=series.index), 'date'
+    return None
+
+
+def infer_column(series: pd.Series) -> Tuple[pd.Series, str]:
+    """
+    Infer the type of one column and return it converted, with its schema type.
+
+    Numeric columns are kept as they are, with integers narrowed to int32
+    where they fit. Text columns are parsed with ``_parse_text``; text that
+    does not parse becomes 'category' or 'string'.
+    """
+    if pd.api.types.is_bool_dtype(series):
+        return series, 'bool'
+    if pd.api.types.is_integer_dtype(series):
+        return _compact_ints(series)
+    if pd.api.types.is_float_dtype(series):
+        return series.astype('float64'), 'float64'
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series, 'datetime'
+
+    inferred = pd.api.types.infer_dtype(series, skipna=True)
+    if inferred != 'string':
+        # Object columns from spreadsheets may mix numbers and text
+        if inferred in ('integer', 'floating', 'mixed-integer-float'):
+            return infer_column(pd.to_numeric(series))
+        return series, 'object'
+
+    parsed = _parse_text(series)
+    if parsed is not None:
+        return parsed
+    if series.nunique() <= category_max_ratio() * len(series):
+        return series, 'category'
+    return series, 'string'
+
+
+def _stored_values(series: pd.Series, dtype: str, original: list) -> list:
+    """Plain Python values of a column for the extraction output: NaN/NaT as None, dates as ISO strings."""
+    if dtype == 'date':
+        return pc.strftime(pa.array(series, from_pandas=True), format='%Y-%m-%d').to_pylist()
+    if dtype in ('float64', 'int32', 'int64'):
+        return series.astype(object).where(series.notna(), None).tolist()
+    return original
+
+
+def infer_columns(columns: List[Any], column_data: List[list]) -> Tuple[List[str], List[list], Dict[str, str]]:
+    """
+    Infer the schema of a table given as columns and one value list per column.
+
+    Returns the normalized column names, the column values (parsed values
+    for parsed columns, the original list otherwise) and the schema.
+    """
+    columns = normalize_columns(columns)
+    stored = []
+    schema = {}
+    for name, values in zip(columns, column_data):
+        series, dtype = infer_column(pd.Series(values, dtype=object if not values else None))
+        stored.append(_stored_values(series, dtype, values))
+        schema[name] = dtype
+    return columns, stored, schema
+
+
+def _records_to_columns(table: Dict[str, Any]) -> Tuple[List[str], List[list]]:
+    rows = table.get('data', [])
+    # Rows may not all have the same keys; use the union in first-seen order
+    seen = dict.fromkeys(table_columns(table))
+    for row in rows:
+        seen.update(dict.fromkeys(row))
+    columns = list(seen)
+    return columns, [[row.get(col) for row in rows] for col in columns]
+
+
+def _coerce(values: list, dtype: str) -> list:
+    """
+    Convert a later batch of a streamed table to the type inferred from its
+    first batch. Strings that parse as that type are converted, blanks
+    become None and anything else is kept as it is.
+    """
+    series = pd.Series(values, dtype=object)
+    is_text = series.map(type).eq(str)
+    if not is_text.any():
+        return values
+    text = series[is_text].str.strip()
+    series.loc[text[text == ''].index] = None
+    if dtype == 'date':
+        for pattern, date_format in ((_LOCALE_DATE, '%d.%m.%Y'), (_ISO_DATE, '%Y-%m-%d')):
+            matches = text[text.str.fullmatch(pattern)]
+            dates = pd.to_datetime(matches.str.rstrip('.'), format=date_format, errors='coerce').dropna()
+            series.loc[dates.index] = dates.dt.strftime('%Y-%m-%d')
+    else:
+        matches = text[text.str.fullmatch(_LOCALE_NUMBER) & ~text.str.match(_LEADING_ZERO)]
+        numbers = pd.to_numeric(matches.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+        series.loc[numbers.index] = numbers.astype(object if dtype != 'float64' else 'float64').tolist()
+    return series.tolist()
+
+
+def typed_table(table: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a table in the columnar layout with normalized column names,
+    parsed columns and its 'schema'.
+
+    Tables in the batches layout stay batched: the schema is inferred from
+    the first batch, which is read here, and later batches are converted to
+    it as they are consumed (values that do not parse are kept as they are).
+    """
+    meta = table_meta(table)
+    name_key = 'sheet_name' if 'sheet_name' in meta else 'table_number'
+
+    if is_batched(table):
+        batches = iter(table['batches'])
+        first = next(batches, None)
+        columns = normalize_columns(table['columns'])
+        if first is None:
+            result = {**meta, 'layout': table['layout'], 'columns': columns, 'batches': iter(())}
+            result[SCHEMA_KEY] = {name: 'object' for name in columns}
+            return result
+        columns, first, schema = infer_columns(table['columns'], first)
+        rest = (
+            [
+                _coerce(values, schema[name]) if schema[name] in ('float64', 'int32', 'int64', 'date') else values
+                for name, values in zip(columns, column_data)
+            ]
+            for column_data in batches
+        )
+        return {**meta, SCHEMA_KEY: schema, 'layout': table['layout'], 'columns': columns, 'batches': chain([first], rest)}
+
+    if is_columnar(table):
+        columns, column_data = table['columns'], table['column_data']
+    else:
+        columns, column_data = _records_to_columns(table)
+    columns, column_data, schema = infer_columns(columns, column_data)
+    typed = columnar_table(name_key, meta.get(name_key), columns, column_data)
+    typed.update({k: v for k, v in meta.items() if k != name_key})
+    typed[SCHEMA_KEY] = schema
+    return typed
+
+
+def typed_values(values: Any, dtype: Optional[str]):
+    """
+    Build a compact array for a column of stored values and its schema type.
+
+    Numbers become float64/int32/int64 arrays, dates datetime64, text with
+    few distinct values a Categorical; anything else an object array.
+    Values that are already a pandas Series (read from a bundle) keep their
+    dtype.
+    """
+    if isinstance(values, pd.Series):
+        return values.to_numpy() if not isinstance(values.dtype, pd.CategoricalDtype) else values.array
+    try:
+        if dtype == 'float64':
+            return np.array(values, dtype='float64')
+        if dtype in ('int32', 'int64'):
+            return np.array(values, dtype=dtype)
+        if dtype == 'date':
+            return pd.to_datetime(pd.Series(values, dtype=object), format='%Y-%m-%d').to_numpy()
+        if dtype == 'category':
+            return pd.Categorical(values)
+    except (TypeError, ValueError):
+        # A value that does not fit the schema, e.g. a streamed batch that did not parse
+        pass
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def missing_values(like: List[Any], num_rows: int):
+    """All-missing values for a table that lacks a column, typed like the column's other pieces."""
+    for piece in like:
+        if isinstance(piece, pd.Categorical):
+            return pd.Categorical([None] * num_rows, categories=piece.categories)
+        if piece.dtype.kind in 'iuf':
+            return np.full(num_rows, np.nan)
+        if piece.dtype.kind == 'M':
+            return np.full(num_rows, np.datetime64('NaT'), dtype=piece.dtype)
+    return np.full(num_rows, None, dtype=object)
+
+
+def concat_values(pieces: List[Any]):
+    """
+    Concatenate typed column pieces into one column.
+
+    Categoricals are unioned (so the column stays categorical), pieces of
+    one kind keep their dtype and anything mixed falls back to objects.
+    """
+    if all(isinstance(piece, pd.Categorical) for piece in pieces):
+        return pd.api.types.union_categoricals(pieces, ignore_order=True)
+    kinds = {'c' if isinstance(piece, pd.Categorical) else piece.dtype.kind for piece in pieces}
+    if kinds <= {'i', 'u', 'f'} or len(kinds) == 1 and 'O' not in kinds and 'c' not in kinds:
+        return np.concatenate(pieces)
+    return np.concatenate([np.asarray(piece, dtype=object) for piece in pieces])
+
+
+def labels(names: List[Any], counts: List[int]) -> pd.Categorical:
+    """A categorical column holding ``names[i]`` ``counts[i]`` times, e.g. the source file of every row."""
+    categories = list(dict.fromkeys(names))
+    positions = {name: idx for idx, name in enumerate(categories)}
+    codes = np.repeat(np.array([positions[name] for name in names], dtype=np.int32), counts)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def has_schema(table: Dict[str, Any]) -> bool:
+    return SCHEMA_KEY in table
@@ -1,49 +1,298 @@
-import pandas as pd
-import tabula.io as tabula
-from docx import Document
 from pathlib import Path
-import json
-import PyPDF2
+import multiprocessing
 import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterator, Optional
+from app.services.disk_cache import atomic_copy
+from app.services.extraction_cache import ExtractionCache, content_hash, get_extraction_cache
+from app.services.excel_reader import FAST_ENGINES, iter_workbook_columns
+from app.services.docx_reader import iter_docx_tables
+from app.services.pdf_reader import detect_table_pages, format_page_ranges, page_ranges, start_tabula_jvm, tabula_in_process
+from app.services.table_format import COLUMNAR, batched_table, columnar_table, table_row_count, to_records_table, unique_columns
+from app.services.intermediate_store import FORMATS, JSON, is_extraction_file, output_path_for, source_filename, write_extraction
+from app.services.manifest import ClientManifest
+from app.services.file_index import get_file_index
+from app.services.file_variants import remove_variants
+from app.services.metrics import Stage, StageTimings, record_stage
+
+# Bump whenever a change to the extractors changes their output, so cached extractions are not reused
+EXTRACTOR_VERSION = '5'
+
+SUPPORTED_EXTENSIONS = ['.xlsx', '.pdf', '.docx']
+
+# Worker process pools for EXTRACTION_MODE=process, by size; kept for the
+# life of the server so that workers (and their JVMs) are started only once.
+# Workers are spawned, not forked: pools are created from job threads while
+# other threads (the job pool, the AI client's event loop) may hold locks
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def _process_file_in_worker(upload_dir: str, processed_dir: str, filename: str) -> dict:
+    """Entry point for extracting a single file inside a worker process."""
+    return TableExtractor(upload_dir, processed_dir).process_file(filename)
+
+
+def default_extraction_workers() -> int:
+    return int(os.getenv('EXTRACTION_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+
+def get_extraction_pool(max_workers: int) -> ProcessPoolExecutor:
+    """The shared pool of ``max_workers`` extraction processes, created on first use."""
+    with _pools_lock:
+        if max_workers not in _pools:
+            _pools[max_workers] = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pools[max_workers]
+
+
+def _discard_pool(max_workers: int, pool: ProcessPoolExecutor):
+    """Drop a pool whose worker died, so that the next run starts a fresh one."""
+    with _pools_lock:
+        if _pools.get(max_workers) is pool:
+            del _pools[max_workers]
+    pool.shutdown(wait=False)
+
+
+def shutdown_extraction_pools(wait: bool = True):
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait)
+
 
 class TableExtractor:
-    def __init__(self, upload_dir: str, processed_dir: str):
+    def __init__(
+        self,
+        upload_dir: str,
+        processed_dir: str,
+        extraction_mode: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        use_cache: bool = True,
+        timings: Optional[StageTimings] = None,
+        job_id: Optional[str] = None
+    ):
         self.upload_dir = Path(upload_dir)
         self.processed_dir = Path(processed_dir)
+        self.use_cache = use_cache
+        # Per-stage totals of this extractor's runs, for the job result
+        self.timings = timings
+        # Recorded in the file index as the source of new extraction outputs
+        self.job_id = job_id
+        # 'sequential' extracts files one by one, 'process' extracts them in parallel worker processes
+        self.extraction_mode = extraction_mode or os.getenv('EXTRACTION_MODE', 'sequential')
+        self.max_workers = max_workers or default_extraction_workers()
+        # 'pandas', 'openpyxl-readonly' or 'calamine'; the last two skip DataFrame construction
+        self.excel_engine = os.getenv('EXCEL_ENGINE', 'pandas')
+        # 'records' (list of row dicts) or 'columnar' (column names plus column value lists)
+        self.excel_layout = os.getenv('EXCEL_LAYOUT', 'records')
+        # 'json', or 'arrow'/'parquet' for a memory-mappable columnar table bundle
+        self.intermediate_format = os.getenv('INTERMEDIATE_FORMAT', JSON)
+        # PDFs: only read pages that look like they hold a table, in parallel page ranges
+        self.pdf_detect_table_pages = os.getenv('PDF_DETECT_TABLE_PAGES', '1') != '0'
+        self.pdf_min_table_lines = int(os.getenv('PDF_MIN_TABLE_LINES', '2'))
+        self.pdf_pages_per_task = max(1, int(os.getenv('PDF_PAGES_PER_TASK', '1')))
+        self.pdf_workers = int(os.getenv('PDF_WORKERS', str(min(4, os.cpu_count() or 1))))
+        # 'stream' parses word/document.xml incrementally, 'python-docx' goes through Document.tables
+        self.docx_extraction_mode = os.getenv('DOCX_EXTRACTION_MODE', 'stream')
+        # 'streaming' writes each table (or batch of rows) as soon as it is extracted
+        self.pipeline_mode = os.getenv('PIPELINE_MODE', 'materialized')
+        self.batch_rows = int(os.getenv('STREAM_BATCH_ROWS', '10000'))
+        # Normalize column names and parse locale-formatted numbers and dates, see schema_inference;
+        # off by default, as it changes the stored layout and what is sent to the AI endpoint
+        self.schema_inference = os.getenv('SCHEMA_INFERENCE', '0') == '1'
+        self.last_run_stats = {}
+
+    def iter_excel_tables(self, file_path: Path) -> Iterator[dict]:
+        """
+        Yield the sheets of an Excel file one at a time.
+
+        The workbook is opened and parsed once. With a fast engine
+        (EXCEL_ENGINE=openpyxl-readonly or calamine) cells are read as plain
+        values without building DataFrames; EXCEL_LAYOUT=columnar keeps each
+        sheet as column names plus one value list per column.
+        """
+        if self.excel_engine in FAST_ENGINES:
+            for sheet_name, columns, column_data in iter_workbook_columns(file_path, self.excel_engine):
+                if not columns or not column_data or not column_data[0]:
+                    continue
+                table = columnar_table('sheet_name', sheet_name, columns, column_data)
+                yield table if self.excel_layout == COLUMNAR else to_records_table(table)
+            return
+
+        import pandas as pd
+
+        with pd.ExcelFile(file_path) as excel_file:
+            for sheet_name in excel_file.sheet_names:
+                df = excel_file.parse(sheet_name)
+                if not df.empty:
+                    if self.excel_layout == COLUMNAR:
+                        yield columnar_table(
+                            'sheet_name',
+                            sheet_name,
+                            [str(col) for col in df.columns],
+                            [df[col].tolist() for col in df.columns]
+                        )
+                    else:
+                        yield {
+                            'sheet_name': sheet_name,
+                            'data': df.to_dict(orient='records')
+                        }
 
     def extract_from_excel(self, file_path: Path) -> list:
-        """Extract tables from Excel files."""
-        tables = []
-        excel_file = pd.ExcelFile(file_path)
-        
-        for sheet_name in excel_file.sheet_names:
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
-            if not df.empty:
-                tables.append({
-                    'sheet_name': sheet_name,
-                    'data': df.to_dict(orient='records')
-                })
-        
-        return tables
+        """Extract tables from Excel files, see ``iter_excel_tables``."""
+        return list(self.iter_excel_tables(file_path))
+
+    def _read_pdf_pages(self, file_path: Path, pages: str) -> tuple:
+        """Run tabula over one page range; returns its tables and the time it took."""
+        import tabula.io as tabula
+
+        start = time.perf_counter()
+        pdf_tables = tabula.read_pdf(str(file_path), pages=pages, multiple_tables=True)
+        return pdf_tables, time.perf_counter() - start
+
+    def _pdf_ranges(self, pages: list, page_count: int) -> list:
+        """Split page numbers into the page ranges of the tabula calls, in tabula's syntax."""
+        if tabula_in_process():
+            return [format_page_ranges([page_range]) for page_range in page_ranges(pages, self.pdf_pages_per_task)]
+        return [format_page_ranges(page_ranges(pages, page_count))]
+
+    def _iter_pdf_ranges(self, file_path: Path, ranges: list) -> Iterator[tuple]:
+        """Read page ranges with tabula, on PDF_WORKERS threads if there are several; yields (pages, tables, seconds) in page order."""
+        if tabula_in_process():
+            start_tabula_jvm()
+        if len(ranges) > 1 and self.pdf_workers > 1:
+            executor = ThreadPoolExecutor(max_workers=min(self.pdf_workers, len(ranges)), thread_name_prefix='pdf-pages')
+            futures = [executor.submit(self._read_pdf_pages, file_path, pages) for pages in ranges]
+            results = (future.result() for future in futures)
+        else:
+            executor = None
+            results = (self._read_pdf_pages(file_path, pages) for pages in ranges)
+
+        try:
+            for pages, (pdf_tables, seconds) in zip(ranges, results):
+                yield pages, pdf_tables, seconds
+        finally:
+            if executor is not None:
+                for future in futures:
+                    future.cancel()
+                executor.shutdown(wait=True)
+
+    def iter_pdf_tables(self, file_path: Path, page_timings: Optional[list] = None) -> Iterator[dict]:
+        """
+        Yield the tables of a PDF in page order as they are extracted.
+
+        Each table records the page range it was found in under 'pages'.
+
+        PyPDF2 counts the pages and, unless PDF_DETECT_TABLE_PAGES=0, picks
+        the pages that look like they hold a table; if none does, or tabula
+        finds no table on them, every other page is read as well. With JPype
+        installed tabula runs in one long-lived in-process JVM, and the pages
+        are split into ranges of PDF_PAGES_PER_TASK pages that it reads on
+        PDF_WORKERS threads. Without JPype every tabula call starts Java, so
+        all pages are read in a single call.
+
+        Args:
+            page_timings: If given, one {'pages', 'tables', 'seconds'} entry
+                per page range is appended to it.
+        """
+        page_count, pages = detect_table_pages(file_path, self.pdf_min_table_lines)
+        skipped = []
+        if page_count == 0:
+            # PyPDF2 cannot read the file, let tabula try the whole document
+            passes = [['all']]
+        else:
+            if not pages or not self.pdf_detect_table_pages:
+                pages = list(range(1, page_count + 1))
+            selected = set(pages)
+            skipped = [page for page in range(1, page_count + 1) if page not in selected]
+            passes = [self._pdf_ranges(pages, page_count)]
+
+        import pandas as pd
+
+        table_number = 0
+        found = False
+        while passes:
+            # Ranges are consumed in page order, so tables come out in document order
+            for pages, pdf_tables, seconds in self._iter_pdf_ranges(file_path, passes.pop(0)):
+                if page_timings is not None:
+                    page_timings.append({'pages': pages, 'tables': len(pdf_tables), 'seconds': round(seconds, 4)})
+                for table in pdf_tables:
+                    table_number += 1
+                    if isinstance(table, pd.DataFrame) and not table.empty:
+                        found = True
+                        yield {
+                            'table_number': table_number,
+                            'pages': pages,
+                            'data': table.to_dict(orient='records')
+                        }
+            if not found and skipped:
+                # The page check can be wrong; rather read the rest than return nothing
+                passes.append(self._pdf_ranges(skipped, page_count))
+                skipped = []
+
+    def extract_from_pdf(self, file_path: Path, page_timings: Optional[list] = None) -> list:
+        """
+        Extract tables from PDF files.
+
+        Args:
+            page_timings: Optional list that receives per page range timings, see ``iter_pdf_tables``.
+        """
+        return list(self.iter_pdf_tables(file_path, page_timings))
+
+    def extract_from_docx(self, file_path: Path) -> list:
+        """
+        Extract tables from DOCX files.
+
+        By default word/document.xml is streamed (see ``iter_docx_tables``):
+        merged cells keep their text once, with '' in the columns and rows
+        they cover, and repeated header names get a '.N' suffix.
+        DOCX_EXTRACTION_MODE=python-docx uses the python-docx object model.
+        """
+        if self.docx_extraction_mode == 'python-docx':
+            return self._extract_from_docx_python_docx(file_path)
 
-    def extract_from_pdf(self, file_path: Path) -> list:
-        """Extract tables from PDF files."""
         tables = []
-        
-        # Try tabula-py first for table extraction
-        pdf_tables = tabula.read_pdf(str(file_path), pages='all', multiple_tables=True)
-        
-        for idx, table in enumerate(pdf_tables):
-            if isinstance(table, pd.DataFrame) and not table.empty:
-                tables.append({
-                    'table_number': idx + 1,
-                    'data': table.to_dict(orient='records')
-                })
-        
+        for table_number, rows in iter_docx_tables(file_path):
+            headers = unique_columns(next(rows))
+            tables.append({
+                'table_number': table_number,
+                'data': [dict(zip(headers, row)) for row in rows]
+            })
         return tables
 
-    def extract_from_docx(self, file_path: Path) -> list:
-        """Extract tables from DOCX files."""
+    def iter_docx_table_batches(self, file_path: Path) -> Iterator[dict]:
+        """
+        Yield the tables of a DOCX file in the batches layout.
+
+        Rows are read from word/document.xml while the table is consumed,
+        STREAM_BATCH_ROWS at a time; rows shorter than the header are padded
+        with None. Each table must be consumed before the next one is read.
+        """
+        def batches(headers, rows):
+            width = len(headers)
+            batch = []
+            for row in rows:
+                batch.append(row[:width] + [None] * (width - len(row)))
+                if len(batch) >= self.batch_rows:
+                    yield [list(values) for values in zip(*batch)]
+                    batch = []
+            # Always at least one batch, so header-only tables keep their columns
+            yield [list(values) for values in zip(*batch)] if batch else [[] for _ in headers]
+
+        for table_number, rows in iter_docx_tables(file_path):
+            headers = unique_columns(next(rows))
+            yield batched_table('table_number', table_number, headers, batches(headers, rows))
+
+    def _extract_from_docx_python_docx(self, file_path: Path) -> list:
+        from docx import Document
+
         tables = []
         doc = Document(str(file_path))
         
@@ -66,45 +315,269 @@ class TableExtractor:
         
         return tables
 
+    def _extraction_options(self) -> dict:
+        """Settings that change extraction output and must be part of the cache key."""
+        return {
+            'excel_engine': self.excel_engine,
+            'excel_layout': self.excel_layout,
+            'intermediate_format': self.intermediate_format,
+            'pdf_detect_table_pages': self.pdf_detect_table_pages,
+            'pdf_min_table_lines': self.pdf_min_table_lines,
+            'docx_extraction_mode': self.docx_extraction_mode,
+            'pipeline_mode': self.pipeline_mode,
+            'schema_inference': self.schema_inference
+        }
+
+    def _extraction_stages(self) -> list:
+        """The stages process_file runs to extract a file."""
+        if self.pipeline_mode == 'streaming':
+            return ['extract']
+        return ['extract', 'infer_schema', 'write_intermediate'] if self.schema_inference else ['extract', 'write_intermediate']
+
+    def _iter_tables(self, filename: str, file_path: Path, stats: dict) -> Iterator[dict]:
+        """Yield the extracted tables one by one, for PIPELINE_MODE=streaming."""
+        if filename.lower().endswith('.xlsx'):
+            return self.iter_excel_tables(file_path)
+        elif filename.lower().endswith('.pdf'):
+            return self.iter_pdf_tables(file_path, page_timings=stats.setdefault('page_timings', []))
+        elif filename.lower().endswith('.docx'):
+            if self.docx_extraction_mode == 'python-docx':
+                return iter(self._extract_from_docx_python_docx(file_path))
+            return self.iter_docx_table_batches(file_path)
+        else:
+            raise ValueError(f"Unsupported file type: {filename}")
+
+    def _extract_tables(self, filename: str, file_path: Path, stats: dict) -> list:
+        if filename.lower().endswith('.xlsx'):
+            return self.extract_from_excel(file_path)
+        elif filename.lower().endswith('.pdf'):
+            return self.extract_from_pdf(file_path, page_timings=stats.setdefault('page_timings', []))
+        elif filename.lower().endswith('.docx'):
+            return self.extract_from_docx(file_path)
+        else:
+            raise ValueError(f"Unsupported file type: {filename}")
+
     def process_file(self, filename: str) -> dict:
-        """Process a single file and extract tables."""
+        """
+        Process a single file and extract tables.
+
+        The output is keyed by the file's content hash and EXTRACTOR_VERSION;
+        if the existing output (or the shared extraction cache) already holds
+        that key, extraction is skipped.
+        """
         file_path = self.upload_dir / filename
-        output_path = self.processed_dir / f"{filename}.json"
+        output_path = output_path_for(self.processed_dir, filename, self.intermediate_format)
+        start = time.perf_counter()
+        stats = {}
+        stages = []
         
         try:
-            if filename.lower().endswith('.xlsx'):
-                tables = self.extract_from_excel(file_path)
-            elif filename.lower().endswith('.pdf'):
-                tables = self.extract_from_pdf(file_path)
-            elif filename.lower().endswith('.docx'):
-                tables = self.extract_from_docx(file_path)
-            else:
-                raise ValueError(f"Unsupported file type: {filename}")
-
-            # Save extracted tables to JSON
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'filename': filename,
-                    'tables': tables
-                }, f, ensure_ascii=False, indent=2)
+            # The output records the upload's filename, so the same bytes uploaded under another name are a different entry
+            key = ExtractionCache.cache_key(
+                content_hash(file_path), file_path.suffix, EXTRACTOR_VERSION, self._extraction_options(), filename=filename
+            )
+            cache = get_extraction_cache() if self.use_cache else None
+            cache_status = 'disabled'
+            if cache is not None:
+                cache_status = 'miss'
+                if cache.output_matches(output_path, key):
+                    cache_status = 'hit'
+                else:
+                    cached_path = cache.get_path(key)
+                    if cached_path is not None:
+                        try:
+                            atomic_copy(cached_path, output_path)
+                            cache.mark_output(output_path, key)
+                            cache_status = 'hit'
+                        except FileNotFoundError:
+                            # Evicted by another job or worker since get_path; extract it again
+                            pass
+
+            if cache_status != 'hit':
+                # Stages are recorded by process_all_files, which may run in another process
+                if self.pipeline_mode == 'streaming':
+                    # Extraction and writing are interleaved and timed together
+                    with Stage('extract', file_path.suffix, self.intermediate_format, record=False) as stage:
+                        tables = self._iter_tables(filename, file_path, stats)
+                        if self.schema_inference:
+                            from app.services.schema_inference import typed_table
+                            tables = map(typed_table, tables)
+                        write_extraction(output_path, filename, tables, self.intermediate_format)
+                        stage.bytes = file_path.stat().st_size
+                    stages.append(stage.to_dict())
+                else:
+                    with Stage('extract', file_path.suffix, record=False) as stage:
+                        tables = self._extract_tables(filename, file_path, stats)
+                        stage.rows = sum(table_row_count(table) for table in tables)
+                        stage.bytes = file_path.stat().st_size
+                    stages.append(stage.to_dict())
+
+                    if self.schema_inference:
+                        from app.services.schema_inference import typed_table
+
+                        with Stage('infer_schema', file_path.suffix, record=False) as schema_stage:
+                            tables = [typed_table(table) for table in tables]
+                            schema_stage.rows = stage.rows
+                        stages.append(schema_stage.to_dict())
+
+                    # Save extracted tables in the intermediate format
+                    with Stage('write_intermediate', file_path.suffix, self.intermediate_format, record=False) as write_stage:
+                        write_extraction(output_path, filename, tables, self.intermediate_format)
+                        write_stage.rows = stage.rows
+                        write_stage.bytes = output_path.stat().st_size
+                    stages.append(write_stage.to_dict())
+
+                if cache is not None:
+                    cache.mark_output(output_path, key)
+                    cache.put_file(key, output_path)
+
+            # Drop outputs left over from a run with another intermediate format
+            for fmt in FORMATS:
+                stale_path = output_path_for(self.processed_dir, filename, fmt)
+                if stale_path != output_path and stale_path.exists():
+                    os.remove(stale_path)
+                    if cache is not None:
+                        cache.forget_output(stale_path)
+                    remove_variants(stale_path)
 
             return {
                 'status': 'success',
+                'filename': filename,
                 'message': f'Successfully extracted tables from {filename}',
-                'output_file': str(output_path)
+                'output_file': str(output_path),
+                'input_key': key,
+                'cache': cache_status,
+                'duration_seconds': round(time.perf_counter() - start, 4),
+                'stages': stages,
+                **stats
             }
 
         except Exception as e:
             return {
                 'status': 'error',
-                'message': f'Error processing {filename}: {str(e)}'
+                'filename': filename,
+                'message': f'Error processing {filename}: {str(e)}',
+                'duration_seconds': round(time.perf_counter() - start, 4)
             }
 
-    def process_all_files(self) -> list:
-        """Process all files in the upload directory."""
-        results = []
-        for file_path in self.upload_dir.glob('*'):
-            if file_path.suffix.lower() in ['.xlsx', '.pdf', '.docx']:
-                result = self.process_file(file_path.name)
+    def list_input_files(self) -> list:
+        """List supported files in the upload directory, sorted by name."""
+        return sorted(
+            file_path.name for file_path in self.upload_dir.glob('*')
+            if file_path.suffix.lower() in SUPPORTED_EXTENSIONS
+        )
+
+    def process_all_files(self, on_result: Optional[Callable[[dict], None]] = None) -> list:
+        """
+        Process all files in the upload directory.
+
+        Results are returned in filename order regardless of the extraction mode,
+        and a failure in one file never affects the others.
+
+        Args:
+            on_result: Optional; called with each file's result as soon as it is ready
+        """
+        filenames = self.list_input_files()
+        start = time.perf_counter()
+
+        if self.extraction_mode == 'process' and len(filenames) > 1:
+            results = self._process_files_parallel(filenames, on_result)
+        else:
+            results = []
+            for filename in filenames:
+                result = self.process_file(filename)
                 results.append(result)
-        return results 
\ No newline at end of file
+                if on_result:
+                    on_result(result)
+
+        if self.use_cache:
+            cache = get_extraction_cache()
+            for result in results:
+                if result.get('cache') in ('hit', 'miss'):
+                    cache.record(result['cache'] == 'hit')
+
+        for result in results:
+            for record in result.get('stages', []):
+                record_stage(record, self.timings)
+            if self.timings is not None and result.get('cache') == 'hit':
+                self.timings.skip(*self._extraction_stages())
+
+        removed_outputs = self._update_manifest(filenames, results)
+        get_file_index(self.processed_dir).record(
+            [result['output_file'] for result in results if result['status'] == 'success' and result['cache'] != 'hit'],
+            self.job_id
+        )
+
+        wall_seconds = time.perf_counter() - start
+        sum_file_seconds = sum(result.get('duration_seconds', 0) for result in results)
+        self.last_run_stats = {
+            'mode': self.extraction_mode,
+            'files': len(results),
+            'wall_seconds': round(wall_seconds, 4),
+            'sum_file_seconds': round(sum_file_seconds, 4),
+            'cache_hits': sum(1 for result in results if result.get('cache') == 'hit'),
+            'removed_outputs': removed_outputs,
+            'speedup': round(sum_file_seconds / wall_seconds, 2) if wall_seconds > 0 else None
+        }
+        return results
+
+    def _update_manifest(self, filenames: list, results: list) -> list:
+        """
+        Record each extraction in the client manifest and drop extractions of removed uploads.
+
+        Outputs whose upload no longer exists (e.g. it was replaced by a file
+        with another extension) would otherwise keep being combined and sent
+        to the AI endpoint. Returns the names of the removed outputs.
+        """
+        manifest = ClientManifest(self.processed_dir)
+        for result in results:
+            if result['status'] == 'success':
+                manifest.record(
+                    f"extraction:{result['filename']}",
+                    {'upload': result['filename'], 'key': result['input_key']},
+                    [result['output_file']],
+                    cache=result['cache']
+                )
+
+        removed = []
+        current = set(filenames)
+        for path in sorted(self.processed_dir.glob('*')):
+            if path.is_file() and is_extraction_file(path) and source_filename(path) not in current:
+                os.remove(path)
+                get_extraction_cache().forget_output(path)
+                remove_variants(path)
+                removed.append(path.name)
+        for stage in list(manifest.stages):
+            if stage.startswith('extraction:') and stage.split(':', 1)[1] not in current:
+                manifest.remove(stage)
+
+        manifest.save()
+        return removed
+
+    def _process_files_parallel(self, filenames: list, on_result: Optional[Callable[[dict], None]] = None) -> list:
+        """Extract each file in a worker process of the shared extraction pool."""
+        results = {}
+        executor = get_extraction_pool(self.max_workers)
+
+        futures = {
+            executor.submit(_process_file_in_worker, str(self.upload_dir), str(self.processed_dir), filename): filename
+            for filename in filenames
+        }
+        for future in as_completed(futures):
+            filename = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker itself died (e.g. crashed JVM); report it like any other extraction error
+                if isinstance(e, BrokenProcessPool):
+                    _discard_pool(self.max_workers, executor)
+                result = {
+                    'status': 'error',
+                    'filename': filename,
+                    'message': f'Error processing {filename}: {str(e)}'
+                }
+            results[filename] = result
+            if on_result:
+                on_result(result)
+
+        return [results[filename] for filename in filenames]
@@ -0,0 +1,102 @@
+from typing import Any, Dict, Iterator, List
+
+# Extracted tables come in two layouts:
+#   records:  {'sheet_name': ..., 'data': [{column: value, ...}, ...]}
+#   columnar: {'sheet_name': ..., 'layout': 'columnar', 'columns': [...], 'column_data': [[...], ...]}
+# where 'column_data' holds one list of values per entry in 'columns'. A
+# columnar table read with a column projection that matched none of its
+# columns has no column_data left and keeps its row count in 'num_rows'.
+#
+# While streaming, an extractor may also hand over a table whose rows are
+# still being read:
+#   batches:  {'sheet_name': ..., 'layout': 'batches', 'columns': [...], 'batches': <iterator>}
+# where every item of 'batches' is a column_data list for the next rows.
+# Such a table can only be consumed once.
+COLUMNAR = 'columnar'
+BATCHES = 'batches'
+NUM_ROWS = 'num_rows'
+
+
+def columnar_table(name_key: str, name: Any, columns: List[str], column_data: List[list]) -> Dict[str, Any]:
+    return {
+        name_key: name,
+        'layout': COLUMNAR,
+        'columns': columns,
+        'column_data': column_data
+    }
+
+
+def batched_table(name_key: str, name: Any, columns: List[str], batches: Iterator[List[list]]) -> Dict[str, Any]:
+    return {
+        name_key: name,
+        'layout': BATCHES,
+        'columns': columns,
+        'batches': batches
+    }
+
+
+def unique_columns(header: List[Any]) -> List[str]:
+    """Name columns the way pandas.read_excel does: 'Unnamed: N' for blanks, 'name.N' for duplicates."""
+    columns = []
+    seen = {}
+    for idx, value in enumerate(header):
+        name = f'Unnamed: {idx}' if value is None or value == '' else str(value)
+        if name in seen:
+            seen[name] += 1
+            candidate = f'{name}.{seen[name]}'
+            while candidate in seen:
+                seen[name] += 1
+                candidate = f'{name}.{seen[name]}'
+            name = candidate
+        seen.setdefault(name, 0)
+        columns.append(name)
+    return columns
+
+
+def is_columnar(table: Dict[str, Any]) -> bool:
+    return table.get('layout') == COLUMNAR
+
+
+def is_batched(table: Dict[str, Any]) -> bool:
+    return table.get('layout') == BATCHES
+
+
+def table_columns(table: Dict[str, Any]) -> List[str]:
+    """Column names of a table in any layout."""
+    if is_columnar(table) or is_batched(table):
+        return list(table['columns'])
+    data = table.get('data', [])
+    return list(data[0].keys()) if data else []
+
+
+def table_row_count(table: Dict[str, Any]) -> int:
+    if is_columnar(table):
+        return len(table['column_data'][0]) if table['column_data'] else table.get(NUM_ROWS, 0)
+    return len(table.get('data', []))
+
+
+def iter_table_rows(table: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Iterate over a table's rows as dicts, whatever its layout."""
+    if not is_columnar(table):
+        yield from table.get('data', [])
+        return
+    columns = table['columns']
+    if not columns:
+        yield from ({} for _ in range(table_row_count(table)))
+        return
+    for values in zip(*table['column_data']):
+        yield dict(zip(columns, values))
+
+
+def table_meta(table: Dict[str, Any]) -> Dict[str, Any]:
+    """Everything but the table's rows, e.g. its sheet_name or table_number."""
+    return {k: v for k, v in table.items() if k not in ('data', 'layout', 'columns', 'column_data', 'batches', NUM_ROWS)}
+
+
+def to_records_table(table: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the table in the records layout."""
+    if not is_columnar(table):
+        return table
+    records = table_meta(table)
+    records['data'] = list(iter_table_rows(table))
+    return records
@@ -0,0 +1,113 @@
+import importlib
+import os
+import tempfile
+import time
+from concurrent.futures import wait
+from typing import Any, Dict, List, Optional
+
+# In the order they run. Pool workers are spawned processes, so they run
+# their own imports (and start their own JVM) in _warm_worker
+PREWARM_TARGETS = ('imports', 'pool', 'jvm')
+
+# Modules that processing needs but serving the API does not
+WARM_MODULES = ('pandas', 'numpy', 'openpyxl', 'pyarrow', 'PyPDF2', 'lxml.etree', 'app.services.ai_processor')
+
+
+def _blank_pdf() -> bytes:
+    """A valid one-page PDF without content, for starting tabula."""
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 200 200] >>'
+    ]
+    pdf = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(pdf)
+    pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    pdf += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return pdf
+
+
+def warm_imports():
+    """Import the modules the extraction and processing stages load lazily."""
+    for name in WARM_MODULES:
+        importlib.import_module(name)
+
+
+def warm_jvm():
+    """Start tabula's JVM (or check the java command) by reading an empty PDF."""
+    import tabula.io as tabula
+
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_blank_pdf())
+        tabula.read_pdf(path, pages='1', multiple_tables=True)
+    finally:
+        os.remove(path)
+
+
+def _warm_worker(jvm: bool) -> int:
+    """Runs in an extraction worker process; returns its pid."""
+    warm_imports()
+    if jvm:
+        warm_jvm()
+    return os.getpid()
+
+
+def warm_pool(jvm: bool = False) -> int:
+    """
+    Start the processes of the shared extraction pool and warm each one up.
+
+    Returns the number of worker processes that ran a warm-up task.
+    """
+    from app.services.table_extractor import default_extraction_workers, get_extraction_pool
+
+    max_workers = default_extraction_workers()
+    pool = get_extraction_pool(max_workers)
+    futures = [pool.submit(_warm_worker, jvm) for _ in range(max_workers)]
+    wait(futures)
+    return len({future.result() for future in futures})
+
+
+def prewarm(targets: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Warm up this worker process before it serves requests.
+
+    Targets are given by PREWARM, a comma-separated list of 'imports',
+    'pool' (the extraction process pool, whose workers also start their
+    JVM if 'jvm' is given) and 'jvm' (tabula's JVM in this process); the
+    default is 'imports'. A target that fails is reported and skipped, the
+    work is then done on first use as without pre-warming.
+
+    Returns ``{target: {'status', 'seconds', ...}}`` for the startup report.
+    """
+    if targets is None:
+        targets = [target.strip() for target in os.getenv('PREWARM', 'imports').split(',') if target.strip()]
+    unknown = [target for target in targets if target not in PREWARM_TARGETS]
+    if unknown:
+        raise ValueError(f"Unsupported prewarm targets: {', '.join(unknown)}")
+
+    report = {}
+    for target in PREWARM_TARGETS:
+        if target not in targets:
+            continue
+        start = time.perf_counter()
+        try:
+            if target == 'imports':
+                warm_imports()
+                entry: Dict[str, Any] = {'status': 'success'}
+            elif target == 'pool':
+                entry = {'status': 'success', 'workers': warm_pool(jvm='jvm' in targets)}
+            else:
+                warm_jvm()
+                entry = {'status': 'success'}
+        except Exception as e:
+            entry = {'status': 'error', 'message': str(e)}
+        entry['seconds'] = round(time.perf_counter() - start, 4)
+        report[target] = entry
+    return report
@@ -0,0 +1,113 @@
+"""
+Benchmark AIProcessor.combine_tables against the previous row-by-row implementation.
+
+Usage:
+    python benchmarks/bench_combine_tables.py [--rows 500000] [--columns 30] [--files 2]
+
+The synthetic input spreads ``--rows`` rows over ``--files`` extracted files.
+Every file has ``--columns`` columns, two thirds of which are shared between
+files with a different letter case per file.
+"""
+import argparse
+import gc
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.ai_processor import AIProcessor  # noqa: E402
+
+
+def legacy_combine_tables(all_data: List[Dict[str, Any]], common_columns: List[str]) -> pd.DataFrame:
+    """combine_tables as it was before vectorization."""
+    combined_data = []
+
+    for file_data in all_data:
+        filename = file_data['filename']
+        for table in file_data['tables']:
+            table_name = table.get('sheet_name', table.get('table_number', 'unknown'))
+            for row in table['data']:
+                processed_row = {
+                    'source_file': filename,
+                    'table_name': table_name
+                }
+
+                for col in common_columns:
+                    matching_col = next(
+                        (k for k in row.keys() if k.lower() == col.lower()),
+                        None
+                    )
+                    processed_row[col] = row.get(matching_col, None)
+
+                combined_data.append(processed_row)
+
+    return pd.DataFrame(combined_data)
+
+
+def make_tables(rows: int, columns: int, files: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    shared = max(1, columns * 2 // 3)
+    rows_per_file = rows // files
+    all_data = []
+
+    for file_idx in range(files):
+        names = [f'Kolona_{i}' for i in range(shared)]
+        names = [name.upper() if file_idx % 2 else name for name in names]
+        names += [f'Fajl{file_idx}_{i}' for i in range(columns - shared)]
+
+        amounts = rng.random((rows_per_file, len(names))).round(2).tolist()
+        partners = [f'Partner {i % 5000}' for i in range(rows_per_file)]
+        data = []
+        for partner, values in zip(partners, amounts):
+            row = dict(zip(names, values))
+            row[names[0]] = partner
+            data.append(row)
+
+        all_data.append({
+            'filename': f'file_{file_idx}.xlsx',
+            'tables': [{'sheet_name': 'Sheet1', 'data': data}]
+        })
+
+    return all_data
+
+
+def timed(func, *args):
+    gc.collect()
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--columns', type=int, default=30)
+    parser.add_argument('--files', type=int, default=2)
+    parser.add_argument('--skip-legacy', action='store_true', help='only time the current implementation')
+    args = parser.parse_args()
+
+    print(f'Generating {args.rows} rows x {args.columns} columns in {args.files} files...')
+    all_data = make_tables(args.rows, args.columns, args.files)
+
+    processor = AIProcessor('.')
+    common_columns = processor.find_common_columns(processor.analyze_table_structure(all_data))
+    print(f'{len(common_columns)} common columns')
+
+    combined, seconds = timed(processor.combine_tables, all_data, common_columns)
+    print(f'combine_tables:        {seconds:8.3f} s  ({len(combined) / seconds:,.0f} rows/s)')
+
+    if not args.skip_legacy:
+        legacy, legacy_seconds = timed(legacy_combine_tables, all_data, common_columns)
+        print(f'legacy combine_tables: {legacy_seconds:8.3f} s  ({len(legacy) / legacy_seconds:,.0f} rows/s)')
+        print(f'speedup:               {legacy_seconds / seconds:8.1f}x')
+        pd.testing.assert_frame_equal(combined, legacy)
+        print('outputs are identical')
+
+
+if __name__ == '__main__':
+    main()
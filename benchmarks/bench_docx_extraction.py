@@ -0,0 +1,116 @@
+"""
+Benchmark streaming DOCX table extraction against python-docx.
+
+Usage:
+    python benchmarks/bench_docx_extraction.py [--rows 20000] [--columns 8] [--tables 2]
+                                               [--legacy-rows 1000] [--merged] [--memory]
+
+The synthetic documents are written as raw WordprocessingML, with ``--tables``
+tables of ``--rows`` rows each. python-docx rebuilds every cell of a table
+for each row it reads, so its time grows with the square of the row count
+(1,000 rows take minutes); it is therefore timed on tables of
+``--legacy-rows`` rows, together with the streaming reader on the same file. ``--merged`` adds a header cell spanning two
+columns and a vertically merged first column every 10 rows; the outputs of
+the two modes then differ by design, so they are only compared without it.
+"""
+import argparse
+import gc
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.table_extractor import TableExtractor  # noqa: E402
+from benchmarks.fiscal_reports import CONTENT_TYPES, DOCUMENT_END, DOCUMENT_START, RELS, docx_cell as _cell  # noqa: E402
+
+
+def _rows(rows: int, columns: int, merged: bool):
+    if merged:
+        yield [_cell('Partner'), _cell('Iznos', '<w:gridSpan w:val="2"/>')] + [_cell(f'Kolona {c}') for c in range(3, columns)]
+    else:
+        yield [_cell('Partner')] + [_cell(f'Kolona {c}') for c in range(1, columns)]
+
+    for r in range(rows):
+        if merged and r % 10:
+            first = _cell('', '<w:vMerge/>')
+        elif merged:
+            first = _cell(f'Partner {r // 10}', '<w:vMerge w:val="restart"/>')
+        else:
+            first = _cell(f'Partner {r}')
+        yield [first] + [_cell(f'{r * c},{c:02d}') for c in range(1, columns)]
+
+
+def write_docx(path: Path, rows: int, columns: int, tables: int, merged: bool = False):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', RELS)
+        with archive.open('word/document.xml', 'w') as document:
+            document.write(DOCUMENT_START)
+            for table in range(tables):
+                document.write(f'<w:p><w:r><w:t>Tabela {table + 1}</w:t></w:r></w:p><w:tbl>'.encode())
+                document.write(('<w:tblGrid>' + '<w:gridCol/>' * columns + '</w:tblGrid>').encode())
+                for cells in _rows(rows, columns, merged):
+                    document.write(('<w:tr>' + ''.join(cells) + '</w:tr>').encode())
+                document.write(b'</w:tbl>')
+            document.write(DOCUMENT_END)
+
+
+def measure(extractor: TableExtractor, file_path: Path, trace_memory: bool = False):
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    tables = extractor.extract_from_docx(file_path)
+    seconds = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return tables, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--columns', type=int, default=8)
+    parser.add_argument('--tables', type=int, default=2)
+    parser.add_argument('--legacy-rows', type=int, default=1_000, help='rows per table for the python-docx run')
+    parser.add_argument('--merged', action='store_true', help='add horizontally and vertically merged cells')
+    parser.add_argument('--memory', action='store_true', help='also report peak Python memory (slows both modes down)')
+    parser.add_argument('--skip-legacy', action='store_true', help='only time the streaming reader')
+    args = parser.parse_args()
+
+    runs = [('stream', args.rows)]
+    if not args.skip_legacy:
+        runs += [('stream', args.legacy_rows), ('python-docx', args.legacy_rows)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        extractor = TableExtractor(tmp_dir, tmp_dir)
+        results = {}
+        for mode, rows in runs:
+            file_path = Path(tmp_dir) / f'bench_{rows}.docx'
+            if not file_path.exists():
+                write_docx(file_path, rows, args.columns, args.tables, args.merged)
+            extractor.docx_extraction_mode = mode
+            tables, seconds, peak = measure(extractor, file_path, args.memory)
+            results[mode, rows] = (tables, seconds)
+            row_count = sum(len(table['data']) for table in tables)
+            memory = f', peak {peak / 2**20:,.1f} MiB' if peak is not None else ''
+            print(f'{mode:12s} {args.tables} x {rows:>7,} rows  {seconds:8.3f} s  '
+                  f'({row_count / seconds:,.0f} rows/s{memory})')
+
+        if not args.skip_legacy:
+            stream_tables, stream_seconds = results['stream', args.legacy_rows]
+            legacy_tables, legacy_seconds = results['python-docx', args.legacy_rows]
+            print(f'speedup at {args.legacy_rows:,} rows: {legacy_seconds / stream_seconds:8.1f}x')
+            if not args.merged:
+                assert stream_tables == legacy_tables
+                print('outputs are identical')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark schema inference and the typed combine against object-dtype tables.
+
+Usage:
+    python benchmarks/bench_schema_inference.py [--rows 500000] [--files 2]
+
+The input is what the PDF and DOCX extractors produce for the synthetic
+fiscal reports: text cells with amounts formatted the Serbian way
+(``1.234,56``), spread over ``--files`` files. Combining the raw tables
+gives the object-dtype DataFrame of SCHEMA_INFERENCE=0; inferring the
+schemas first gives a typed one. Both are timed and their memory use is
+reported.
+"""
+import argparse
+import gc
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.ai_processor import AIProcessor  # noqa: E402
+from app.services.schema_inference import typed_table  # noqa: E402
+from app.services.table_format import columnar_table  # noqa: E402
+from benchmarks.fiscal_reports import COLUMNS, KINDS, format_amount, report_rows  # noqa: E402
+
+
+def make_tables(rows: int, files: int) -> List[Dict[str, Any]]:
+    all_data = []
+    for file_idx in range(files):
+        kind = KINDS[file_idx % len(KINDS)]
+        text_rows = [
+            row[:3] + [format_amount(value) for value in row[3:]]
+            for row in report_rows(rows // files, kind, seed=file_idx)
+        ]
+        column_data = [list(values) for values in zip(*text_rows)]
+        all_data.append({
+            'filename': f'{kind}_{file_idx}.docx',
+            'tables': [columnar_table('table_number', 1, list(COLUMNS), column_data)]
+        })
+    return all_data
+
+
+def timed(func, *args):
+    gc.collect()
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--files', type=int, default=2)
+    args = parser.parse_args()
+
+    print(f'Generating {args.rows} rows in {args.files} files...')
+    raw = make_tables(args.rows, args.files)
+    processor = AIProcessor('.')
+    common_columns = [col.lower() for col in COLUMNS]
+
+    untyped, untyped_seconds = timed(processor.combine_tables, raw, common_columns)
+
+    def infer_all():
+        return [
+            {'filename': file_data['filename'], 'tables': [typed_table(table) for table in file_data['tables']]}
+            for file_data in raw
+        ]
+
+    typed_data, infer_seconds = timed(infer_all)
+    typed, typed_seconds = timed(processor.combine_tables, typed_data, common_columns)
+
+    untyped_mb = untyped.memory_usage(deep=True).sum() / 2 ** 20
+    typed_mb = typed.memory_usage(deep=True).sum() / 2 ** 20
+    print(f'schema inference:        {infer_seconds:8.3f} s  ({args.rows / infer_seconds:,.0f} rows/s)')
+    print(f'combine (object dtypes): {untyped_seconds:8.3f} s  {untyped_mb:9.1f} MiB')
+    print(f'combine (typed):         {typed_seconds:8.3f} s  {typed_mb:9.1f} MiB')
+    print(f'memory:                  {untyped_mb / typed_mb:8.1f}x smaller')
+    print('typed dtypes: ' + ', '.join(f'{col}={dtype}' for col, dtype in typed.dtypes.items()))
+
+
+if __name__ == '__main__':
+    main()
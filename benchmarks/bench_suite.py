@@ -0,0 +1,355 @@
+"""
+Benchmark suite for extraction, combining and the full HTTP flow.
+
+Usage:
+    python benchmarks/bench_suite.py [--rows 5000] [--repeats 5] [--warmup 1]
+                                     [--formats xlsx,docx,pdf] [--scenarios extract,process_tables,e2e]
+                                     [--e2e-format xlsx] [--output results.json]
+    python benchmarks/bench_suite.py --compare BASE.json NEW.json
+
+Scenarios, run on synthetic kupci/prodavci reports (benchmarks/fiscal_reports.py)
+of ``--rows`` rows each:
+
+    extract          TableExtractor.process_file on one report per format, without the cache
+    process_tables   AIProcessor.process_tables over two kupci and two prodavci extractions
+    e2e              /create-client-folder, /upload of the four report types and /process,
+                     polled to completion, against benchmarks/stub_ai_server.py on a local port
+
+Each scenario runs in a fresh process, so its peak RSS is its own. Every
+run reports p50/p99/mean latency, throughput in rows and megabytes per
+second and peak RSS, and is saved as JSON together with the git commit and
+the pipeline settings from the environment (INTERMEDIATE_FORMAT,
+PIPELINE_MODE, ...), by default to benchmarks/results/. ``--compare``
+prints the p50 and peak RSS of two saved runs side by side.
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fiscal_reports import FORMATS, write_report  # noqa: E402
+
+SCENARIOS = ('extract', 'process_tables', 'e2e')
+RESULTS_DIR = ROOT / 'benchmarks' / 'results'
+
+# Upload types of the application and the kind of report each one holds
+REPORT_TYPES = {
+    'kraj-fiskalne-kupci': 'kupci',
+    'presek-bilansa-kupci': 'kupci',
+    'kraj-fiskalne-prodavci': 'prodavci',
+    'presek-bilansa-prodavci': 'prodavci'
+}
+
+# Environment variables that change what is being measured
+SETTINGS = (
+    'EXTRACTION_MODE', 'EXCEL_ENGINE', 'EXCEL_LAYOUT', 'INTERMEDIATE_FORMAT', 'DOCX_EXTRACTION_MODE',
+    'PDF_DETECT_TABLE_PAGES', 'PDF_PAGES_PER_TASK', 'PDF_WORKERS', 'PIPELINE_MODE', 'STREAM_BATCH_ROWS',
+    'OUTPUT_FORMATS', 'AI_CHUNK_ROWS', 'AI_MAX_CONCURRENT_CHUNKS'
+)
+
+
+def latency_stats(seconds: List[float]) -> Dict[str, float]:
+    values = np.array(seconds)
+    return {
+        'p50': round(float(np.percentile(values, 50)), 6),
+        'p99': round(float(np.percentile(values, 99)), 6),
+        'mean': round(float(values.mean()), 6),
+        'min': round(float(values.min()), 6),
+        'max': round(float(values.max()), 6)
+    }
+
+
+def measure(func: Callable[[int], Any], repeats: int, warmup: int) -> List[float]:
+    """Call ``func(iteration)`` ``warmup + repeats`` times and return the timed durations."""
+    seconds = []
+    for iteration in range(warmup + repeats):
+        start = time.perf_counter()
+        func(iteration)
+        if iteration >= warmup:
+            seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def summarize(seconds: List[float], rows: int, size: int) -> Dict[str, Any]:
+    p50 = float(np.percentile(seconds, 50))
+    return {
+        'latency_seconds': latency_stats(seconds),
+        'rows': rows,
+        'bytes': size,
+        'rows_per_second': round(rows / p50, 1),
+        'mb_per_second': round(size / 2 ** 20 / p50, 3)
+    }
+
+
+def bench_extract(work_dir: Path, fmt: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.table_extractor import TableExtractor
+
+    upload_dir, processed_dir = work_dir / 'uploads', work_dir / 'processed'
+    upload_dir.mkdir()
+    processed_dir.mkdir()
+    report = write_report(upload_dir / f'kraj-fiskalne-kupci.{fmt}', args['rows'], 'kupci')
+    extractor = TableExtractor(str(upload_dir), str(processed_dir), use_cache=False)
+
+    def run(iteration: int):
+        result = extractor.process_file(report.name)
+        if result['status'] != 'success':
+            raise RuntimeError(result['message'])
+
+    seconds = measure(run, args['repeats'], args['warmup'])
+    return summarize(seconds, args['rows'], report.stat().st_size)
+
+
+def bench_process_tables(work_dir: Path, fmt: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.ai_processor import AIProcessor
+    from app.services.table_extractor import TableExtractor
+
+    upload_dir, processed_dir = work_dir / 'uploads', work_dir / 'processed'
+    upload_dir.mkdir()
+    processed_dir.mkdir()
+    for seed, (file_type, kind) in enumerate(REPORT_TYPES.items()):
+        write_report(upload_dir / f'{file_type}.{fmt}', args['rows'], kind, seed)
+    for result in TableExtractor(str(upload_dir), str(processed_dir), use_cache=False).process_all_files():
+        if result['status'] != 'success':
+            raise RuntimeError(result['message'])
+
+    processor = AIProcessor(str(processed_dir))
+
+    def run(iteration: int):
+        result = processor.process_tables()
+        if result['status'] != 'success':
+            raise RuntimeError(result['message'])
+
+    seconds = measure(run, args['repeats'], args['warmup'])
+    size = sum(path.stat().st_size for path in processed_dir.iterdir() if path.name != 'combined_result.json')
+    return summarize(seconds, args['rows'] * len(REPORT_TYPES), size)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def bench_e2e(work_dir: Path, fmt: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    import uvicorn
+
+    # The application keeps uploads, outputs and caches relative to the working directory
+    os.chdir(work_dir)
+    port = _free_port()
+    os.environ['AZURE_AI_FOUNDRY_ENDPOINT'] = f'http://127.0.0.1:{port}/process'
+    os.environ.setdefault('AZURE_AI_FOUNDRY_API_KEY', 'stub')
+    os.environ.setdefault('AI_RATE_LIMIT_PER_SECOND', '0')
+
+    from benchmarks.stub_ai_server import app as stub_app
+    server = uvicorn.Server(uvicorn.Config(stub_app, host='127.0.0.1', port=port, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+
+    from fastapi.testclient import TestClient
+    import main
+
+    reports = work_dir / 'reports'
+    reports.mkdir()
+    seconds, upload_seconds, process_seconds, sizes = [], [], [], []
+    stage_timings = {}
+
+    def run(iteration: int):
+        # A new client and new report contents each time, so no cache or earlier output is reused
+        client_name = f'bench{iteration}'
+        files = [
+            write_report(reports / f'{file_type}-{iteration}.{fmt}', args['rows'], kind, seed=iteration * 10 + seed)
+            for seed, (file_type, kind) in enumerate(REPORT_TYPES.items())
+        ]
+
+        start = time.perf_counter()
+        client.post('/create-client-folder', data={'client_name': client_name}).raise_for_status()
+        for file_type, path in zip(REPORT_TYPES, files):
+            with open(path, 'rb') as f:
+                client.post(f'/upload/{client_name}/{file_type}', files={'file': (path.name, f)}).raise_for_status()
+        uploaded = time.perf_counter()
+
+        response = client.post(f'/process/{client_name}', params={'use_ai_cache': 'false'})
+        response.raise_for_status()
+        status_url = response.json()['status_url']
+        while True:
+            job = client.get(status_url).json()
+            if job['status'] in ('completed', 'failed'):
+                break
+            time.sleep(0.01)
+        finished = time.perf_counter()
+
+        result = job.get('result') or {}
+        if job['status'] != 'completed' or result.get('status') != 'success':
+            raise RuntimeError(job.get('error') or result.get('message') or job['status'])
+        if iteration >= args['warmup']:
+            seconds.append(finished - start)
+            upload_seconds.append(uploaded - start)
+            process_seconds.append(finished - uploaded)
+            sizes.append(sum(path.stat().st_size for path in files))
+            stage_timings.update(result.get('stage_timings', {}))
+
+    try:
+        with TestClient(main.app) as client:
+            # Generating the reports is not part of the timed flow
+            for iteration in range(args['warmup'] + args['repeats']):
+                run(iteration)
+    finally:
+        server.should_exit = True
+
+    result = summarize(seconds, args['rows'] * len(REPORT_TYPES), int(np.mean(sizes)))
+    result['stages'] = {
+        'upload': latency_stats(upload_seconds),
+        'process': latency_stats(process_seconds)
+    }
+    # The application's own per-stage totals for the last run
+    result['stage_timings'] = stage_timings
+    return result
+
+
+_BENCHMARKS = {
+    'extract': bench_extract,
+    'process_tables': bench_process_tables,
+    'e2e': bench_e2e
+}
+
+
+def run_scenario(scenario: str, fmt: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one scenario; meant to be called in a fresh process."""
+    from app.services.metrics import peak_rss_bytes
+
+    record = {'scenario': scenario, 'format': fmt}
+    baseline = peak_rss_bytes()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cwd = os.getcwd()
+        try:
+            record.update(_BENCHMARKS[scenario](Path(tmp_dir), fmt, args))
+        except Exception as e:
+            record['error'] = f'{type(e).__name__}: {e}'
+        finally:
+            os.chdir(cwd)
+    record['baseline_rss_bytes'] = baseline
+    record['peak_rss_bytes'] = peak_rss_bytes()
+    return record
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*command: str) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ['git', *command], cwd=ROOT, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'subject': git('log', '-1', '--format=%s'),
+        'dirty': bool(status) if status is not None else None
+    }
+
+
+def _print_record(record: Dict[str, Any]):
+    name = f'{record["scenario"]:15s} {record["format"]:5s}'
+    if 'error' in record:
+        print(f'{name} failed: {record["error"]}')
+        return
+    latency = record['latency_seconds']
+    rss = record['peak_rss_bytes'] or 0
+    print(f'{name} p50 {latency["p50"]:8.3f} s  p99 {latency["p99"]:8.3f} s  '
+          f'{record["rows_per_second"]:>12,.0f} rows/s  {record["mb_per_second"]:8.2f} MB/s  '
+          f'peak RSS {rss / 2 ** 20:,.0f} MiB')
+
+
+def compare(base_path: Path, new_path: Path):
+    base, new = (json.loads(Path(path).read_text(encoding='utf-8')) for path in (base_path, new_path))
+    print(f'base: {base["git"]["commit"]} {base["git"]["subject"]}')
+    print(f'new:  {new["git"]["commit"]} {new["git"]["subject"]}')
+    base_records = {(record['scenario'], record['format']): record for record in base['results']}
+    for record in new['results']:
+        old = base_records.get((record['scenario'], record['format']))
+        name = f'{record["scenario"]:15s} {record["format"]:5s}'
+        if old is None or 'error' in old or 'error' in record:
+            print(f'{name} not comparable')
+            continue
+        old_p50, new_p50 = old['latency_seconds']['p50'], record['latency_seconds']['p50']
+        old_rss, new_rss = (old['peak_rss_bytes'] or 0) / 2 ** 20, (record['peak_rss_bytes'] or 0) / 2 ** 20
+        print(f'{name} p50 {old_p50:8.3f} -> {new_p50:8.3f} s ({new_p50 / old_p50:5.2f}x)  '
+              f'peak RSS {old_rss:,.0f} -> {new_rss:,.0f} MiB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5_000, help='rows per report')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--formats', default=','.join(FORMATS), help='report formats for the extract scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--e2e-format', default='xlsx', help='report format for process_tables and e2e')
+    parser.add_argument('--output', type=Path, help='where to save the results (default: benchmarks/results/)')
+    parser.add_argument('--compare', nargs=2, type=Path, metavar=('BASE', 'NEW'), help='compare two saved runs')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(',') if scenario.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+
+    runs = []
+    for scenario in scenarios:
+        if scenario == 'extract':
+            runs += [(scenario, fmt.strip()) for fmt in args.formats.split(',') if fmt.strip()]
+        else:
+            runs.append((scenario, args.e2e_format))
+
+    params = {'rows': args.rows, 'repeats': args.repeats, 'warmup': args.warmup}
+    report = {
+        'git': git_revision(),
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': params,
+        'settings': {name: os.environ[name] for name in SETTINGS if name in os.environ},
+        'results': []
+    }
+
+    spawn = get_context('spawn')
+    for scenario, fmt in runs:
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+            record = pool.submit(run_scenario, scenario, fmt, params).result()
+        _print_record(record)
+        report['results'].append(record)
+
+    output = args.output
+    if output is None:
+        commit = (report['git']['commit'] or 'unknown')[:10]
+        output = RESULTS_DIR / f'{datetime.now():%Y%m%d-%H%M%S}-{commit}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(f'results saved to {output}')
+
+
+if __name__ == '__main__':
+    main()
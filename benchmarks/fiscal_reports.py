@@ -0,0 +1,177 @@
+"""
+Synthetic kupci/prodavci fiscal reports for the benchmarks.
+
+A report is a partner card: one row per partner with its code, name, tax
+number (PIB) and the debit, credit and balance amounts. The same rows can
+be written as XLSX (numeric cells), DOCX or PDF (amounts formatted the
+Serbian way, e.g. ``1.234,56``). Reports are deterministic for a given
+``seed``, so runs on different commits extract the same data.
+
+    from benchmarks.fiscal_reports import write_report
+    write_report(Path('kupci.xlsx'), rows=10_000, kind='kupci', seed=1)
+"""
+import random
+import zipfile
+from pathlib import Path
+from typing import Iterator, List
+from xml.sax.saxutils import escape
+
+from openpyxl import Workbook
+
+FORMATS = ('xlsx', 'docx', 'pdf')
+KINDS = ('kupci', 'prodavci')
+COLUMNS = ['Sifra', 'Naziv', 'PIB', 'Duguje', 'Potrazuje', 'Saldo']
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+
+RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+DOCUMENT_START = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    b'<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+)
+DOCUMENT_END = b'<w:sectPr/></w:body></w:document>'
+
+# Character widths of the PDF columns, in a monospaced font
+PDF_WIDTHS = [8, 30, 11, 15, 15, 15]
+PDF_ROWS_PER_PAGE = 50
+
+
+def report_rows(rows: int, kind: str = 'kupci', seed: int = 0) -> Iterator[list]:
+    """Yield ``rows`` report rows matching COLUMNS, with float amounts."""
+    rng = random.Random(f'{kind}-{seed}')
+    partner = 'Kupac' if kind == 'kupci' else 'Dobavljac'
+    for r in range(rows):
+        debit = round(rng.uniform(0, 1_000_000), 2)
+        credit = round(rng.uniform(0, 1_000_000), 2)
+        yield [
+            f'{r + 1:06d}',
+            f'{partner} {r + 1} d.o.o.',
+            str(100_000_000 + rng.randrange(900_000_000)),
+            debit,
+            credit,
+            round(debit - credit, 2)
+        ]
+
+
+def format_amount(value: float) -> str:
+    """Format an amount the Serbian way, e.g. ``-1.234,56``."""
+    return f'{value:,.2f}'.replace(',', ' ').replace('.', ',').replace(' ', '.')
+
+
+def _text_rows(rows: int, kind: str, seed: int) -> Iterator[List[str]]:
+    for row in report_rows(rows, kind, seed):
+        yield row[:3] + [format_amount(value) for value in row[3:]]
+
+
+def _title(kind: str) -> str:
+    return 'Kartica kupaca' if kind == 'kupci' else 'Kartica dobavljaca'
+
+
+def write_xlsx(path: Path, rows: int, kind: str = 'kupci', seed: int = 0):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(kind)
+    sheet.append(COLUMNS)
+    for row in report_rows(rows, kind, seed):
+        sheet.append(row)
+    workbook.save(path)
+
+
+def docx_cell(text: str, properties: str = '') -> str:
+    tc_pr = f'<w:tcPr>{properties}</w:tcPr>' if properties else ''
+    return f'<w:tc>{tc_pr}<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p></w:tc>'
+
+
+def docx_paragraph(text: str) -> str:
+    return f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+
+def write_docx(path: Path, rows: int, kind: str = 'kupci', seed: int = 0):
+    """Write the report as a WordprocessingML document with one table, without python-docx."""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', RELS)
+        with archive.open('word/document.xml', 'w') as document:
+            document.write(DOCUMENT_START)
+            document.write((docx_paragraph(_title(kind)) + '<w:tbl>').encode())
+            document.write(('<w:tblGrid>' + '<w:gridCol/>' * len(COLUMNS) + '</w:tblGrid>').encode())
+            for cells in [COLUMNS, *_text_rows(rows, kind, seed)]:
+                document.write(('<w:tr>' + ''.join(docx_cell(cell) for cell in cells) + '</w:tr>').encode())
+            document.write(b'</w:tbl>')
+            document.write(DOCUMENT_END)
+
+
+def _pdf_line(cells: List[str]) -> str:
+    text = ''.join(cell.ljust(width) for cell, width in zip(cells, PDF_WIDTHS)).rstrip()
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path: Path, rows: int, kind: str = 'kupci', seed: int = 0):
+    """
+    Write the report as a text PDF, PDF_ROWS_PER_PAGE rows per page.
+
+    Each page repeats the title and header line; columns are aligned with
+    a monospaced font, as in reports printed from accounting software.
+    """
+    pages = []
+    page = []
+    for cells in _text_rows(rows, kind, seed):
+        page.append(cells)
+        if len(page) == PDF_ROWS_PER_PAGE:
+            pages.append(page)
+            page = []
+    if page or not pages:
+        pages.append(page)
+
+    objects = [
+        '<< /Type /Catalog /Pages 2 0 R >>',
+        '<< /Type /Pages /Kids [{}] /Count {} >>'.format(
+            ' '.join(f'{4 + 2 * i} 0 R' for i in range(len(pages))), len(pages)
+        ),
+        '<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>'
+    ]
+    for number, page in enumerate(pages):
+        lines = [f'{_title(kind)} - strana {number + 1}', '', _pdf_line(COLUMNS)] + [_pdf_line(cells) for cells in page]
+        stream = 'BT /F1 8 Tf 30 810 Td 11 TL ' + ' '.join(f'({line}) Tj T*' for line in lines) + ' ET'
+        objects.append(
+            '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * number} 0 R >>'
+        )
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n{obj}\nendobj\n'.encode('latin-1')
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    for offset in offsets:
+        out += f'{offset:010d} 00000 n \n'.encode()
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    Path(path).write_bytes(out)
+
+
+_WRITERS = {'xlsx': write_xlsx, 'docx': write_docx, 'pdf': write_pdf}
+
+
+def write_report(path: Path, rows: int, kind: str = 'kupci', seed: int = 0) -> Path:
+    """Write a report in the format given by ``path``'s extension."""
+    path = Path(path)
+    _WRITERS[path.suffix.lstrip('.').lower()](path, rows, kind, seed)
+    return path
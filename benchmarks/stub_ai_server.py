@@ -0,0 +1,67 @@
+"""
+Local stand-in for the Azure AI Foundry endpoint.
+
+Run it and point the application at it:
+
+    uvicorn benchmarks.stub_ai_server:app --port 8100
+    export AZURE_AI_FOUNDRY_ENDPOINT=http://127.0.0.1:8100/process
+    export AZURE_AI_FOUNDRY_API_KEY=stub
+
+Every row of every table in the request is returned in ``processed_table``
+together with its source file and the requested table type. Latency and
+failures can be injected to exercise timeouts and retries:
+
+    STUB_AI_LATENCY        seconds to wait before answering (default 0)
+    STUB_AI_FAILURE_RATE   fraction of requests answered with 429/503 (default 0)
+
+GET /stats reports how many requests were received and failed.
+"""
+import asyncio
+import os
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Stub AI endpoint")
+
+stats = {'requests': 0, 'failures': 0, 'rows': 0}
+
+
+def _rows(table_data: dict, table_type: str) -> list:
+    rows = []
+    for file_data in table_data.get('tables', []):
+        for table in file_data.get('tables', []):
+            for row in table.get('data', []):
+                rows.append({**row, 'source_file': file_data.get('filename'), 'table_type': table_type})
+    return rows
+
+
+@app.post("/process")
+async def process(request: Request):
+    stats['requests'] += 1
+    latency = float(os.getenv('STUB_AI_LATENCY', '0'))
+    if latency:
+        await asyncio.sleep(latency)
+
+    if random.random() < float(os.getenv('STUB_AI_FAILURE_RATE', '0')):
+        stats['failures'] += 1
+        status_code = random.choice([429, 503])
+        return JSONResponse(status_code=status_code, content={'error': 'injected failure'}, headers={'Retry-After': '0'})
+
+    body = await request.json()
+    rows = _rows(body.get('table_data', {}), body.get('table_type'))
+    stats['rows'] += len(rows)
+    return {'processed_table': rows}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+@app.post("/stats/reset")
+async def reset_stats():
+    for key in stats:
+        stats[key] = 0
+    return stats
@@ -0,0 +1,16 @@
+# Production server settings: gunicorn -c gunicorn.conf.py main:app
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Processing runs in background threads; requests themselves are short,
+# but large uploads and downloads may take a while on slow links
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = 30
+
+# Each worker imports the app itself, so no thread pools or open files are
+# shared across the fork
+preload_app = False
@@ -1,12 +1,34 @@
-from fastapi import FastAPI, Request, UploadFile, File, HTTPException, Form
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+import time
+# Start of the startup report's import phase
+IMPORT_STARTED = time.perf_counter()
+from fastapi import FastAPI, Request, UploadFile, File, HTTPException, Form, Query
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
 import uvicorn
+import argparse
 import os
-from app.services.table_extractor import TableExtractor
-from app.services.ai_processor import AIProcessor
+import hashlib
+import tempfile
+import aiofiles
+from app.services.table_extractor import SUPPORTED_EXTENSIONS, TableExtractor, shutdown_extraction_pools
+from app.services.job_manager import Job, JobManager, JobQueueFull
+from app.services.job_store import worker_id
+from app.services.warmup import prewarm
+from app.services.extraction_cache import HASH_SUFFIX, get_extraction_cache, write_hash_record
+from app.services.intermediate_store import BUNDLE_SUFFIX, is_extraction_file
+from app.services.file_variants import exported_json
+from app.services.downloads import etag_matches, file_download, iter_json_lines
+from app.services.ai_client import close_ai_client
+from app.services.ai_cache import get_ai_cache
+from app.services.output_writer import MEDIA_TYPES
+from app.services.manifest import fingerprint
+from app.services.file_index import get_file_index
+from app.services.metrics import Stage, StageTimings, record_startup, render_metrics
+from app.services.file_lock import LockTimeout, client_lock
+from contextlib import asynccontextmanager
 from typing import Literal, Optional
 
 # Create required directories
@@ -15,7 +37,37 @@ os.makedirs("processed", exist_ok=True)
 os.makedirs("app/static", exist_ok=True)
 os.makedirs("app/templates", exist_ok=True)
 
-app = FastAPI(title="Table Extraction and Processing")
+# Background processing jobs
+job_manager = JobManager()
+
+# How long this worker took to start, see /startup
+startup_report = {}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    import_seconds = time.perf_counter() - IMPORT_STARTED
+    start = time.perf_counter()
+    prewarm_report = await run_in_threadpool(prewarm)
+    startup_report.update({
+        "worker": worker_id(),
+        "import_seconds": round(import_seconds, 4),
+        "prewarm": prewarm_report,
+        "prewarm_seconds": round(time.perf_counter() - start, 4),
+        "total_seconds": round(time.perf_counter() - IMPORT_STARTED, 4)
+    })
+    record_startup({
+        "import": startup_report["import_seconds"],
+        **{f"prewarm_{target}": entry["seconds"] for target, entry in prewarm_report.items()},
+        "total": startup_report["total_seconds"]
+    })
+    
+    yield
+    
+    job_manager.shutdown(wait=False)
+    close_ai_client()
+    shutdown_extraction_pools(wait=False)
+
+app = FastAPI(title="Table Extraction and Processing", lifespan=lifespan)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -23,6 +75,10 @@ app.mount("/static", StaticFiles(directory="app/static"), name="static")
 # Templates
 templates = Jinja2Templates(directory="app/templates")
 
+# Uploads are streamed to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+
 # File type definitions
 FileType = Literal[
     "kraj-fiskalne-kupci",
@@ -31,6 +87,14 @@ FileType = Literal[
     "presek-bilansa-prodavci"
 ]
 
+# Kinds of files in a client's processed folder
+FileKind = Literal[
+    "extraction",
+    "combined",
+    "json",
+    "processed"
+]
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -81,72 +145,186 @@ async def upload_file(
     new_filename = f"{file_type}{file_extension}"
     file_path = client_dir / new_filename
     
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    # Stream to a temporary file, hashing as we go, then move it into place
+    fd, tmp_path = tempfile.mkstemp(dir=client_dir, prefix=".upload-", suffix=".tmp")
+    os.close(fd)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with Stage("upload_write", file_extension) as stage:
+            async with aiofiles.open(tmp_path, "wb") as buffer:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > MAX_UPLOAD_BYTES:
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"File exceeds the maximum upload size of {MAX_UPLOAD_BYTES} bytes"
+                        )
+                    digest.update(chunk)
+                    await buffer.write(chunk)
+            stage.bytes = size
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    
+    write_hash_record(file_path, digest.hexdigest())
+    
+    # A report uploaded earlier with another extension is replaced by this one;
+    # its extraction is dropped on the next processing run
+    replaced_files = []
+    for extension in SUPPORTED_EXTENSIONS:
+        stale_path = client_dir / f"{file_type}{extension}"
+        if stale_path != file_path and stale_path.exists():
+            os.remove(stale_path)
+            hash_record = stale_path.with_name(stale_path.name + HASH_SUFFIX)
+            if hash_record.exists():
+                os.remove(hash_record)
+            replaced_files.append(stale_path.name)
     
     return JSONResponse(content={
         "status": "success",
         "message": f"File uploaded successfully as {new_filename}",
         "file_type": file_type,
-        "client_name": client_name
+        "client_name": client_name,
+        "size_bytes": size,
+        "sha256": digest.hexdigest(),
+        "replaced_files": replaced_files
     })
 
 @app.get("/download/json/{client_name}/{filename}")
-async def download_json(client_name: str, filename: str):
+async def download_json(client_name: str, filename: str, request: Request):
     file_path = Path("processed") / client_name / filename
     
     if not file_path.exists():
+        # Extractions stored in a binary intermediate format are exported to JSON once, on first download
+        bundle_path = file_path.with_suffix(BUNDLE_SUFFIX)
+        if filename.endswith(".json") and is_extraction_file(bundle_path) and bundle_path.exists():
+            export_path = await run_in_threadpool(exported_json, bundle_path)
+            return await file_download(request.headers, export_path, "application/json", filename)
         raise HTTPException(status_code=404, detail=f"File not found: {filename}")
     
-    return FileResponse(
-        path=str(file_path),
-        filename=filename,
-        media_type="application/json"
+    return await file_download(request.headers, file_path, "application/json", filename)
+
+@app.get("/download/jsonl/{client_name}/{filename}")
+async def download_json_lines(
+    client_name: str,
+    filename: str,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1)
+):
+    file_path = Path("processed") / client_name / filename
+    if not file_path.exists():
+        file_path = file_path.with_suffix(BUNDLE_SUFFIX)
+    
+    if not is_extraction_file(file_path) or not file_path.exists():
+        raise HTTPException(status_code=404, detail=f"Extraction not found: {filename}")
+    
+    return StreamingResponse(
+        iter_json_lines(file_path, offset, limit),
+        media_type="application/x-ndjson"
     )
 
 @app.get("/download/processed/{client_name}/{filename}")
-async def download_processed(client_name: str, filename: str):
+async def download_processed(client_name: str, filename: str, request: Request):
     file_path = Path("processed") / client_name / filename
     
     if not file_path.exists():
         raise HTTPException(status_code=404, detail=f"File not found: {filename}")
     
-    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet" if filename.endswith('.xlsx') else "text/csv"
+    media_type = MEDIA_TYPES.get(file_path.suffix.lower(), "application/octet-stream")
     
-    return FileResponse(
-        path=str(file_path),
-        filename=filename,
-        media_type=media_type
-    )
+    return await file_download(request.headers, file_path, media_type, filename)
 
 @app.get("/list/files/{client_name}")
-async def list_files(client_name: str):
+async def list_files(
+    client_name: str,
+    request: Request,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    kind: Optional[FileKind] = None
+):
     processed_dir = Path("processed") / client_name
     
     if not processed_dir.exists():
         raise HTTPException(status_code=404, detail=f"Client folder not found: {client_name}")
     
-    json_files = [f.name for f in processed_dir.glob("*.json")]
-    excel_files = [f.name for f in processed_dir.glob("*.xlsx")]
-    csv_files = [f.name for f in processed_dir.glob("*.csv")]
+    # Served from the client's file index, newest first
+    entries = await run_in_threadpool(get_file_index(processed_dir).list, kind)
+    page = entries[offset:offset + limit] if limit else entries[offset:]
+    next_offset = offset + len(page)
+    
+    content = {
+        "json_files": [entry["name"] for entry in page if entry["kind"] != "processed"],
+        "processed_files": [entry["name"] for entry in page if entry["kind"] == "processed"],
+        "files": page,
+        "total": len(entries),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset if next_offset < len(entries) else None
+    }
+    
+    etag = f'"{fingerprint(content)[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    return JSONResponse(content=content, headers=headers)
+
+def incremental_summary(extraction_results: list, extraction_stats: dict, ai_result: dict) -> dict:
+    """What a processing run reused from earlier runs and what it recomputed."""
+    summary = ai_result["summary"]
+    ai_results = summary["results"]
+    chunks = sum(result["chunks"] for result in ai_results.values() if not result["reused"])
+    cached_chunks = sum(result["cached_chunks"] for result in ai_results.values() if not result["reused"])
+    merged = None
+    if "merged" in summary["output_files"]:
+        merged = "reused" if summary["reused"]["merged"] else "recomputed"
     
     return {
-        "json_files": json_files,
-        "processed_files": excel_files + csv_files
+        "extraction": {
+            "reused": [r["filename"] for r in extraction_results if r.get("cache") == "hit"],
+            "recomputed": [r["filename"] for r in extraction_results if r.get("cache") != "hit"],
+            "removed": extraction_stats.get("removed_outputs", [])
+        },
+        "ai": {
+            "reused": [t for t, result in ai_results.items() if result["reused"]],
+            "recomputed": [t for t, result in ai_results.items() if not result["reused"]],
+            "chunks_reused": cached_chunks,
+            "chunks_sent": chunks - cached_chunks
+        },
+        "merged": merged
     }
 
-@app.post("/process/{client_name}")
-async def process_files(client_name: str, table_type: Optional[str] = None):
+def run_processing_job(job: Job, client_name: str, table_type: Optional[str] = None, use_ai_cache: bool = True) -> dict:
+    # Runs of the same client are serialized across all worker processes
+    job.set_stage("waiting_for_lock")
+    try:
+        with client_lock(Path("processed") / client_name):
+            return process_client(job, client_name, table_type, use_ai_cache)
+    except LockTimeout as e:
+        return {
+            "status": "error",
+            "message": f"Another run of {client_name} is still in progress: {str(e)}"
+        }
+
+def process_client(job: Job, client_name: str, table_type: Optional[str] = None, use_ai_cache: bool = True) -> dict:
     # Initialize services with client-specific directories
     client_upload_dir = str(Path("uploads") / client_name)
     client_processed_dir = str(Path("processed") / client_name)
     
-    table_extractor = TableExtractor(client_upload_dir, client_processed_dir)
-    ai_processor = AIProcessor(client_processed_dir)
+    # pandas and the AI client are only loaded once the first job runs (or by PREWARM)
+    from app.services.ai_processor import AIProcessor
+    
+    timings = StageTimings()
+    table_extractor = TableExtractor(client_upload_dir, client_processed_dir, timings=timings, job_id=job.job_id)
+    ai_processor = AIProcessor(client_processed_dir, use_cache=use_ai_cache, timings=timings, job_id=job.job_id)
     
     # Extract tables from all files
-    extraction_results = table_extractor.process_all_files()
+    job.set_stage("extraction")
+    start = time.perf_counter()
+    extraction_results = table_extractor.process_all_files(on_result=job.file_finished)
+    job.record_timing("extraction", time.perf_counter() - start)
     
     # Check if any extraction failed
     failed_extractions = [
@@ -155,31 +333,131 @@ async def process_files(client_name: str, table_type: Optional[str] = None):
     ]
     
     if failed_extractions:
-        return JSONResponse(
-            status_code=500,
-            content={
-                "status": "error",
-                "message": "Some files failed to process",
-                "details": failed_extractions
-            }
-        )
+        return {
+            "status": "error",
+            "message": "Some files failed to process",
+            "details": failed_extractions,
+            "extraction_timing": table_extractor.last_run_stats,
+            "stage_timings": timings.to_dict()
+        }
     
     # Process extracted tables with AI
+    job.set_stage("ai_processing")
+    start = time.perf_counter()
     ai_result = ai_processor.process_tables_with_ai(table_type)
+    job.record_timing("ai_processing", time.perf_counter() - start)
     
     if ai_result['status'] == 'error':
-        return JSONResponse(
-            status_code=500,
-            content=ai_result
-        )
+        return {**ai_result, "stage_timings": timings.to_dict()}
     
-    return JSONResponse(content={
+    return {
         "status": "success",
         "message": "Files processed successfully",
         "client_name": client_name,
         "extraction_results": extraction_results,
-        "ai_results": ai_result
-    })
+        "extraction_timing": table_extractor.last_run_stats,
+        "ai_results": ai_result,
+        "stage_timings": timings.to_dict(),
+        "incremental": incremental_summary(extraction_results, table_extractor.last_run_stats, ai_result)
+    }
+
+@app.post("/process/{client_name}")
+async def process_files(client_name: str, table_type: Optional[str] = None, use_ai_cache: bool = True):
+    if not (Path("uploads") / client_name).exists():
+        raise HTTPException(status_code=404, detail=f"Client folder not found: {client_name}")
+    
+    try:
+        job = job_manager.submit(
+            client_name,
+            lambda job: run_processing_job(job, client_name, table_type, use_ai_cache),
+            params={"table_type": table_type, "use_ai_cache": use_ai_cache}
+        )
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    
+    return JSONResponse(
+        status_code=202,
+        content={
+            "status": "accepted",
+            "message": "Processing job submitted",
+            "client_name": client_name,
+            "job_id": job.job_id,
+            "status_url": f"/jobs/{job.job_id}"
+        }
+    )
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    
+    return job.to_dict()
+
+@app.get("/list/jobs/{client_name}")
+async def list_jobs(client_name: str):
+    jobs = job_manager.list_jobs(client_name)
+    
+    return {
+        "client_name": client_name,
+        "jobs": [
+            {
+                "job_id": job.job_id,
+                "status": job.status,
+                "stage": job.stage,
+                "created_at": job.created_at.isoformat()
+            }
+            for job in jobs
+        ]
+    }
+
+@app.get("/startup")
+async def startup():
+    return JSONResponse(content=startup_report)
+
+@app.get("/metrics")
+async def metrics():
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        "extraction": get_extraction_cache().stats(),
+        "ai": get_ai_cache().stats()
+    }
+
+@app.delete("/cache/extraction/{client_name}")
+async def invalidate_extraction_cache(client_name: str):
+    processed_dir = Path("processed") / client_name
+    
+    if not processed_dir.exists():
+        raise HTTPException(status_code=404, detail=f"Client folder not found: {client_name}")
+    
+    removed = get_extraction_cache().invalidate_client(processed_dir)
+    
+    return {
+        "status": "success",
+        "message": f"Invalidated {removed} cached extractions for client: {client_name}",
+        "client_name": client_name,
+        "invalidated": removed
+    }
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the fiscal report processing API")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+        help="Number of worker processes (default: WEB_CONCURRENCY or 1)"
+    )
+    parser.add_argument("--no-reload", action="store_true", help="Disable auto-reload (always off with several workers)")
+    args = parser.parse_args()
+    
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        reload=args.workers == 1 and not args.no_reload,
+        workers=args.workers
+    ) 
\ No newline at end of file